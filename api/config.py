@@ -1,16 +1,27 @@
+import re
 from datetime import timedelta
 from functools import lru_cache
+from typing import Dict, Optional
 
-from pydantic import BaseSettings, Field
+from PIL import features
+from pydantic import BaseSettings, Field, validator
 
 from db_adapters import DatabaseBackends
-from media_adapters import MediaBackends
+from media_adapters import MediaBackends, MediaDelivery
 
+from .images import ImageEncoder, ImageFormat
 from .utils import logger
 
 
 class Settings(BaseSettings):
     media_backend: MediaBackends
+    # How the media files are delivered: PROXY streams them from the API, REDIRECT sends the clients to a temporary
+    # URL of the storage and X-ACCEL/X-SENDFILE let the reverse proxy send them (FS backend).
+    media_delivery: MediaDelivery = MediaDelivery.proxy
+    # Internal nginx location serving the media folder, used by X-ACCEL
+    media_accel_prefix: str = "/protected-media"
+    # Seconds the REDIRECT URLs are valid for
+    media_url_expiration: int = Field(3600, gt=0)
     db_backend: DatabaseBackends
     # Comma-separated trusted origins list.
     cors_origins: str = ""
@@ -19,12 +30,62 @@ class Settings(BaseSettings):
     jwt_cookie_samesite: str = "none"
 
     temp_path: str = "/tmp"
+    # Processes used to transcode images, defaults to the amount of CPUs, 0 transcodes in a thread instead.
+    transcode_workers: Optional[int] = Field(None, ge=0)
+    # Seconds without progress after which a slice job is considered interrupted (e.g. by a restart) and failed
+    slice_job_timeout: int = Field(600, gt=0)
+    # Smaller versions of the pages generated when a chapter is committed, as a JSON object: {name: max width}.
+    # Set it to {} to skip them.
+    page_renditions: Dict[str, int] = {"thumbnail": 200, "mobile": 720}
+    # Saves the pages once per content in `objects/`, the chapters reference them by hash.
+    content_addressed_pages: bool = False
+    # Encoder used for the pages, covers and avatars, JPEG is used if Pillow wasn't built with WebP support.
+    image_format: ImageFormat = ImageFormat.jpeg
+    image_quality: int = Field(80, ge=1, le=100)
+    image_progressive: bool = True
+    image_optimize: bool = True
+    # JPEG chroma subsampling: 0 is 4:4:4, 1 is 4:2:2 and 2 is 4:2:0
+    image_subsampling: int = Field(2, ge=0, le=2)
+    # Uploaded images already in the output format are stored as they are when they use at most this many bits per
+    # pixel (and don't need to be converted or rotated), 0 encodes all of them again.
+    image_passthrough_max_bpp: float = Field(4, ge=0)
+    # Removes the metadata of the JPEGs that are stored as they are, the image data isn't modified
+    image_strip_metadata: bool = True
 
     # API Settings
     max_page_limit: int = Field(50, gt=0)
     allow_registration: bool = False
     root_path: str = "/"
 
+    @validator("page_renditions")
+    def validate_renditions(cls, renditions: Dict[str, int]):
+        for name, width in renditions.items():
+            # The names of the version folders are reserved
+            if not name.isidentifier() or re.fullmatch("v[0-9]+", name):
+                raise ValueError(f"'{name}' isn't a valid rendition name")
+            if width <= 0:
+                raise ValueError(f"The width of the '{name}' rendition should be positive")
+        return renditions
+
+    @validator("image_format")
+    def validate_image_format(cls, image_format: ImageFormat):
+        if image_format == ImageFormat.webp and not features.check("webp"):
+            logger.warning("Pillow doesn't support WebP, the images will be saved as JPEG instead")
+            return ImageFormat.jpeg
+        return image_format
+
+    @property
+    def image_encoder(self):
+        return ImageEncoder(
+            format=self.image_format,
+            quality=self.image_quality,
+            progressive=self.image_progressive,
+            optimize=self.image_optimize,
+            subsampling=self.image_subsampling,
+            passthrough_max_bpp=self.image_passthrough_max_bpp,
+            strip_metadata=self.image_strip_metadata,
+        )
+
     @property
     def authjwt(self):
         return {
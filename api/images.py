@@ -0,0 +1,153 @@
+import hashlib
+from contextlib import nullcontext
+from enum import Enum
+from os import path
+from shutil import copyfile, copyfileobj
+from typing import BinaryIO, Union
+
+from PIL import Image
+from pydantic import BaseModel, Field
+
+
+class ImageFormat(str, Enum):
+    jpeg = "JPEG"
+    webp = "WEBP"
+
+
+extensions = {
+    ImageFormat.jpeg: "jpg",
+    ImageFormat.webp: "webp",
+}
+
+ORIENTATION_TAG = 0x0112
+# Metadata segments kept when stripping a JPEG, they change how it's displayed (JFIF, ICC profile and Adobe)
+KEPT_JPEG_SEGMENTS = (0xE0, 0xE2, 0xEE)
+
+
+class ImageEncoder(BaseModel):
+    """
+    Options used to save the pages, covers and avatars.
+    The options that don't apply to the format are ignored (WebP isn't progressive and always uses 4:2:0).
+    """
+
+    format: ImageFormat = ImageFormat.jpeg
+    quality: int = Field(80, ge=1, le=100)
+    progressive: bool = True
+    optimize: bool = True
+    # 0 is 4:4:4, 1 is 4:2:2 and 2 is 4:2:0
+    subsampling: int = Field(2, ge=0, le=2)
+    # Images already in the output format are kept as they are if they use at most this many bits per pixel
+    passthrough_max_bpp: float = Field(4, ge=0)
+    # Removes the metadata (EXIF, XMP, comments...) of the JPEGs that are kept
+    strip_metadata: bool = True
+
+    @property
+    def extension(self):
+        return extensions[self.format]
+
+    @property
+    def options(self):
+        if self.format == ImageFormat.webp:
+            # The slowest method gives the smallest files
+            return {"quality": self.quality, "method": 6 if self.optimize else 4}
+        return {
+            "quality": self.quality,
+            "optimize": self.optimize,
+            "progressive": self.progressive,
+            "subsampling": self.subsampling,
+        }
+
+    def save(self, im: Image.Image, dest: Union[str, BinaryIO]):
+        im.convert("RGB").save(dest, self.format.value, **self.options)
+
+    def can_keep(self, im: Image.Image, size: int):
+        """
+        Whether the image (of `size` bytes) can be saved as it is instead of being encoded again:
+        it's in the output format, doesn't need to be converted or rotated and isn't too heavy.
+        """
+        return (
+            im.format == self.format.value
+            and im.mode in ("RGB", "L")
+            and not getattr(im, "is_animated", False)
+            and im.getexif().get(ORIENTATION_TAG, 1) == 1
+            and size * 8 <= self.passthrough_max_bpp * im.width * im.height
+        )
+
+
+def strip_jpeg(source: BinaryIO, dest: BinaryIO):
+    """
+    Copies the JPEG without its metadata segments, the image data itself is copied byte for byte.
+    Raises a ValueError if the segments can't be read.
+    """
+    if source.read(2) != b"\xff\xd8":
+        raise ValueError("Missing start of image")
+    dest.write(b"\xff\xd8")
+
+    while True:
+        marker = source.read(2)
+        if len(marker) != 2 or marker[0] != 0xFF:
+            raise ValueError("Invalid segment marker")
+
+        if marker[1] == 0xDA:
+            # Start of scan, everything left is image data
+            dest.write(marker)
+            copyfileobj(source, dest)
+            return
+
+        length = source.read(2)
+        if len(length) != 2:
+            raise ValueError("Truncated segment")
+        data = source.read(int.from_bytes(length, "big") - 2)
+
+        if marker[1] == 0xFE or (0xE0 <= marker[1] <= 0xEF and marker[1] not in KEPT_JPEG_SEGMENTS):
+            continue
+        dest.write(marker + length + data)
+
+
+def _keep(source: str, dest: str, encoder: ImageEncoder):
+    """
+    Copies the image without encoding it again, returns False if it needs to be encoded after all.
+    """
+    if encoder.format == ImageFormat.jpeg and encoder.strip_metadata:
+        try:
+            with open(source, "rb") as s, open(dest, "wb") as d:
+                strip_jpeg(s, d)
+        except ValueError:
+            return False
+    else:
+        copyfile(source, dest)
+    return True
+
+
+def file_digest(file: Union[str, BinaryIO]):
+    """
+    SHA-256 of the file (a path or a file object, read from its current position).
+    """
+    sha = hashlib.sha256()
+    with (open(file, "rb") if isinstance(file, str) else nullcontext(file)) as f:
+        while chunk := f.read(1024 * 1024):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def transcode(source: str, dest: str, encoder: ImageEncoder):
+    """
+    Converts the image in `source` with the encoder, it's saved in `dest`. Returns the SHA-256 of the result.
+    Only the header is read when the image can be kept as it is, it's then copied instead of being decoded.
+    This runs in the transcoding pool, so it should only depend on its arguments.
+    """
+    with Image.open(source) as im:
+        if not (encoder.can_keep(im, path.getsize(source)) and _keep(source, dest, encoder)):
+            encoder.save(im, dest)
+    return file_digest(dest)
+
+
+def resize(source: str, dest: str, width: int, encoder: ImageEncoder):
+    """
+    Saves a version of the image in `source` that is at most `width` pixels wide with the encoder in `dest`.
+    This runs in the transcoding pool, so it should only depend on its arguments.
+    """
+    with Image.open(source) as im:
+        if im.width > width:
+            im = im.resize((width, round(im.height * width / im.width)), Image.Resampling.LANCZOS)
+        encoder.save(im, dest)
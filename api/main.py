@@ -11,10 +11,11 @@ from starlette_exporter import PrometheusMiddleware, handle_metrics
 from .config import get_settings
 from .db import db
 from .limiter import limiter, rate_limit_exceeded_handler
-from .media import media
+from .media import get_mount, media
 from .openapi import custom_openapi
 from .routers import auth, autocomplete, chapter, comment, manga, progress, settings, upload, user
 from .utils import logger
+from .workers import shutdown as shutdown_workers
 
 global_settings = get_settings()
 
@@ -45,7 +46,7 @@ app.include_router(settings.router)
 app.include_router(upload.router)
 app.include_router(user.router)
 
-app.mount("/media", media.mount, name="media")
+app.mount("/media", get_mount(), name="media")
 
 # API Rate limiter
 app.state.limiter = limiter
@@ -86,6 +87,7 @@ async def shutdown_event():
     logger.info("Shutting down...")
     await db.shutdown()
     await media.shutdown()
+    shutdown_workers()
 
 
 @app.get("/", include_in_schema=False)
@@ -1,6 +1,16 @@
+import mimetypes
 from functools import lru_cache
+from os import path
+from typing import Optional
+from urllib.parse import quote
 
-from .config import MediaBackends, get_settings
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import RedirectResponse, Response
+from starlette.concurrency import run_in_threadpool
+
+from media_adapters.base import IMMUTABLE_CACHE_CONTROL, is_immutable
+
+from .config import MediaBackends, MediaDelivery, get_settings
 
 global_settings = get_settings()
 
@@ -15,8 +25,97 @@ def get_backend():
         from media_adapters import deta
 
         return deta
+    elif global_settings.media_backend == MediaBackends.s3:
+        from media_adapters import s3
+
+        return s3
     else:
         raise ValueError(f"Unknown media backend {global_settings.db_backend}")
 
 
 media = get_backend()
+
+
+def chapter_folder(chapter) -> str:
+    """
+    Folder of the pages of the chapter, each commit saves them in a new one (`v{media_version}`).
+    The pages of the chapters saved before the versions existed are right in the chapter's folder.
+    """
+    folder = f"{chapter.manga_id}/{chapter.id}"
+    return f"{folder}/v{chapter.media_version}" if chapter.media_version else folder
+
+
+def page_path(chapter, page: int) -> str:
+    """
+    Path of a page (starting at 1), the pages of content-addressed chapters are the objects of their hashes.
+    """
+    if chapter.pages:
+        return media.media.object_path(chapter.pages[page - 1], chapter.extension)
+    return f"{chapter_folder(chapter)}/{page}.{chapter.extension}"
+
+
+def media_url(name: str) -> str:
+    return f"{global_settings.normalized_root_path}/media/{name}"
+
+
+def _valid_name(name: str) -> bool:
+    """
+    If the name is a relative path without empty, `.` or `..` segments, so it can't lead outside of the media folder.
+    """
+    return all(segment not in ("", ".", "..") for segment in name.split("/"))
+
+
+def _local_file(name: str) -> Optional[str]:
+    """
+    Path of the file in the local filesystem, if it exists and is inside the media folder.
+    """
+    local_path = media.media.local_path(name)
+    return local_path if local_path and path.isfile(local_path) else None
+
+
+def _delivery_mount(delivery: MediaDelivery):
+    """
+    Media mount that lets the storage or the reverse proxy send the files, the API only tells them which one.
+    """
+    mount = FastAPI(title="Monochrome media API")
+    expiration = global_settings.media_url_expiration
+
+    @mount.get("/{file:path}")
+    async def get_media_file(file: str):
+        if not _valid_name(file):
+            raise HTTPException(404, "Resource not found")
+
+        if delivery == MediaDelivery.redirect:
+            url = await run_in_threadpool(media.media.url, file, expiration)
+            # The redirect is only cached while the URL is still valid for a while
+            return RedirectResponse(url, headers={"Cache-Control": f"max-age={expiration // 2}"})
+
+        media_type, _ = mimetypes.guess_type(file)
+        # The reverse proxy keeps the caching headers of the API's response
+        headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL} if is_immutable(file) else {}
+        # Resolving the path and checking the file hit the disk, so they don't run in the event loop
+        local_path = await run_in_threadpool(_local_file, file)
+        if not local_path:
+            raise HTTPException(404, "Resource not found")
+        if delivery == MediaDelivery.x_accel:
+            headers["X-Accel-Redirect"] = f"{global_settings.media_accel_prefix.rstrip('/')}/{quote(file)}"
+        else:
+            headers["X-Sendfile"] = local_path
+
+        return Response(media_type=media_type, headers=headers)
+
+    return mount
+
+
+def get_mount():
+    """
+    Returns the app mounted in `/media`, depending on the delivery mode.
+    """
+    delivery = global_settings.media_delivery
+    if delivery == MediaDelivery.proxy:
+        return media.mount
+    elif delivery == MediaDelivery.redirect and not media.media.signed_urls:
+        raise ValueError(f"The {global_settings.media_backend.value} media backend can't redirect to its files")
+    elif delivery in (MediaDelivery.x_accel, MediaDelivery.x_sendfile) and not media.media.local_files:
+        raise ValueError(f"{delivery.value} needs a media backend that keeps its files in the local filesystem")
+    return _delivery_mount(delivery)
@@ -1,9 +1,13 @@
 from typing import Optional
+from urllib.parse import quote
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from fastapi_permissions import has_permission, permission_exception
 
+from db_adapters import CountMode
+
 from ..config import get_settings
 from ..db import db, models
 from ..exceptions import NotFoundHTTPException
@@ -13,6 +17,9 @@ from ..schemas.comment import ChapterCommentsResponse
 from ..utils import logger
 from .auth import Permission, get_active_principals, get_connected_user
 from .responses import chapter as responses
+from .utils.archive import ArchiveFormat, chapter_archive, media_types
+from .utils.pagination import COUNT_DESCRIPTION, CURSOR_DESCRIPTION, decode_cursor, encode_cursor
+from .utils.upload import release_pages
 
 global_settings = get_settings()
 Chapter = models.chapter.Chapter
@@ -35,22 +42,28 @@ async def _get_detailed_chapter(chapter_id: UUID, db_session=Depends(db.db_sessi
     "",
     response_model=LatestChaptersResponse,
     dependencies=[Permission("view", Chapter.__class_acl__)],
+    responses=responses.get_latest_responses,
     openapi_extra=responses.needs_auth,
 )
 async def get_latest_chapters(
     limit: Optional[int] = Query(10, ge=1, le=global_settings.max_page_limit),
     offset: Optional[int] = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    count: CountMode = Query(CountMode.exact, description=COUNT_DESCRIPTION),
     db_session=Depends(db.db_session),
     user: User = Depends(get_connected_user),
 ):
-    count, page = await Chapter.latest(db_session, limit, offset, user.id if user else None)
+    total, page, next_cursor = await Chapter.latest(
+        db_session, limit, offset, user.id if user else None, decode_cursor(cursor), count
+    )
     logger.debug(f"Latest chapter page {page} of length {limit} requested")
 
     return {
-        "offset": offset,
+        "offset": None if cursor else offset,
         "limit": limit,
         "results": page,
-        "total": count,
+        "total": total,
+        "next_cursor": encode_cursor(next_cursor),
     }
 
 
@@ -60,9 +73,22 @@ async def get_chapter(chapter: Chapter = Permission("view", _get_detailed_chapte
     return chapter
 
 
+@router.get("/{chapter_id}/archive", response_class=StreamingResponse, responses=responses.get_archive_responses)
+async def get_chapter_archive(
+    format: ArchiveFormat = Query(ArchiveFormat.cbz, description="Format of the archive, both are ZIP files"),
+    chapter: Chapter = Permission("view", _get_detailed_chapter),
+):
+    logger.debug(f"Chapter {chapter.id} archive requested")
+    filename = f"{chapter.manga.title} - Chapter {chapter.number:g}.{format.value}"
+    headers = {"Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"}
+
+    return StreamingResponse(chapter_archive(chapter), media_type=media_types[format], headers=headers)
+
+
 @router.delete("/{chapter_id}", responses=responses.delete_responses, openapi_extra=responses.needs_auth)
 async def delete_chapter(chapter: Chapter = Permission("edit", _get_chapter), db_session=Depends(db.db_session)):
-    media.media.rmtree(f"{chapter.manga_id}/{chapter.id}")
+    await media.media.armtree(f"{chapter.manga_id}/{chapter.id}")
+    await release_pages(db_session, [chapter])
     logger.debug(f"Chapter {chapter.id} deleted")
     return await chapter.delete(db_session)
 
@@ -91,18 +117,23 @@ async def update_chapter(
 async def get_chapter_comments(
     limit: Optional[int] = Query(10, ge=1, le=global_settings.max_page_limit),
     offset: Optional[int] = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    count: CountMode = Query(CountMode.exact, description=COUNT_DESCRIPTION),
     chapter: Chapter = Permission("view", _get_chapter),
     user_principals=Depends(get_active_principals),
     db_session=Depends(db.db_session),
 ):
     if await has_permission(user_principals, "view", Comment.__class_acl__()):
-        count, page = await Comment.from_chapter(db_session, chapter.id, limit, offset)
+        total, page, next_cursor = await Comment.from_chapter(
+            db_session, chapter.id, limit, offset, decode_cursor(cursor), count
+        )
         logger.debug(f"Comments page of length {limit} requested from chapter {chapter.id}")
         return {
-            "offset": offset,
+            "offset": None if cursor else offset,
             "limit": limit,
             "results": page,
-            "total": count,
+            "total": total,
+            "next_cursor": encode_cursor(next_cursor),
         }
     else:
         logger.info("Comments requested but not allowed to read them")
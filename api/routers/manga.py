@@ -1,10 +1,10 @@
-from tempfile import TemporaryFile
 from typing import List, Optional
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, File, Query, UploadFile, status
 from fastapi_permissions import has_permission, permission_exception
-from PIL import Image
+
+from db_adapters import CountMode
 
 from ..config import get_settings
 from ..db import db, models
@@ -15,6 +15,9 @@ from ..schemas.manga import MangaResponse, MangaSchema, MangaSearchResponse
 from ..utils import logger
 from .auth import Permission, get_active_principals, get_connected_user, is_connected
 from .responses import manga as responses
+from .utils.images import save_image
+from .utils.pagination import COUNT_DESCRIPTION, CURSOR_DESCRIPTION, decode_cursor, encode_cursor
+from .utils.upload import release_pages
 
 global_settings = get_settings()
 Chapter = models.chapter.Chapter
@@ -48,21 +51,29 @@ async def create_manga(
     return manga
 
 
-@router.get("", response_model=MangaSearchResponse, dependencies=[Permission("view", Manga.__class_acl__)])
+@router.get(
+    "",
+    response_model=MangaSearchResponse,
+    dependencies=[Permission("view", Manga.__class_acl__)],
+    responses=responses.search_responses,
+)
 async def search_manga(
     title: str = "",
     limit: Optional[int] = Query(10, ge=1, le=global_settings.max_page_limit),
     offset: Optional[int] = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    count: CountMode = Query(CountMode.exact, description=COUNT_DESCRIPTION),
     db_session=Depends(db.db_session),
 ):
-    count, page = await Manga.search(db_session, title, limit, offset)
-    logger.debug(f"Manga page of length {limit} requested with {title} filter, {count} found")
+    total, page, next_cursor = await Manga.search(db_session, title, limit, offset, decode_cursor(cursor), count)
+    logger.debug(f"Manga page of length {limit} requested with {title} filter, {total} found")
 
     return {
-        "offset": offset,
+        "offset": None if cursor else offset,
         "limit": limit,
         "results": page,
-        "total": count,
+        "total": total,
+        "next_cursor": encode_cursor(next_cursor),
     }
 
 
@@ -93,7 +104,8 @@ async def get_manga_chapters(
 
 @router.delete("/{manga_id}", responses=responses.delete_responses, openapi_extra=responses.needs_auth)
 async def delete_manga(manga: Manga = Permission("edit", _get_manga), db_session=Depends(db.db_session)):
-    media.media.rmtree(str(manga.id))
+    await media.media.armtree(str(manga.id))
+    await release_pages(db_session, await Chapter.from_manga(db_session, manga.id))
 
     return await manga.delete(db_session)
 
@@ -111,12 +123,8 @@ async def update_manga(
     return manga
 
 
-def save_cover(manga_id: UUID, file: File):
-    im = Image.open(file)
-    with TemporaryFile() as f:
-        im.convert("RGB").save(f, "JPEG")
-        f.seek(0)
-        media.media.put(f"{manga_id}/cover.jpg", f)
+async def save_cover(manga_id: UUID, file: File):
+    await save_image(f"{manga_id}/cover", file)
 
 
 @router.put("/{manga_id}/cover", responses=responses.put_cover_responses, openapi_extra=responses.needs_auth)
@@ -128,7 +136,7 @@ async def set_manga_cover(
     if not payload.content_type.startswith("image/"):
         raise BadRequestHTTPException(f"'{payload.filename}' is not an image")
 
-    save_cover(manga.id, payload.file)
+    await save_cover(manga.id, payload.file)
     await manga.save(db_session)
 
     return manga
@@ -1,7 +1,8 @@
 from ...exceptions import NotFoundHTTPException
-from ...schemas.chapter import ChapterResponse, DetailedChapterResponse
+from ...schemas.chapter import ChapterResponse, DetailedChapterResponse, LatestChaptersResponse
 from ...schemas.comment import ChapterCommentsResponse
 from .auth import auth_responses, needs_auth
+from .pagination import cursor_responses
 
 needs_auth = needs_auth
 
@@ -38,8 +39,28 @@ put_responses = {
     },
 }
 
+get_archive_responses = {
+    **get_responses,
+    200: {
+        "description": "The pages of the chapter in a store-only ZIP, streamed as it's generated",
+        "content": {
+            "application/vnd.comicbook+zip": {},
+            "application/zip": {},
+        },
+    },
+}
+
+get_latest_responses = {
+    **cursor_responses,
+    200: {
+        "description": "A page of the latest chapters",
+        "model": LatestChaptersResponse,
+    },
+}
+
 get_comments_responses = {
     **get_responses,
+    **cursor_responses,
     200: {
         "description": "The chapter's comments",
         "model": ChapterCommentsResponse,
@@ -1,7 +1,8 @@
 from ...exceptions import BadRequestHTTPException, NotFoundHTTPException
 from ...schemas.chapter import ChapterResponse
-from ...schemas.manga import MangaResponse
+from ...schemas.manga import MangaResponse, MangaSearchResponse
 from .auth import auth_responses, needs_auth
+from .pagination import cursor_responses
 
 needs_auth = needs_auth
 
@@ -13,6 +14,14 @@ post_responses = {
     },
 }
 
+search_responses = {
+    **cursor_responses,
+    200: {
+        "description": "A page of the manga fitting the search",
+        "model": MangaSearchResponse,
+    },
+}
+
 get_responses = {
     404: {
         "description": "The manga couldn't be found",
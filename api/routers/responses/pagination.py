@@ -0,0 +1,8 @@
+from ...exceptions import BadRequestHTTPException
+
+cursor_responses = {
+    400: {
+        "description": "The cursor is invalid",
+        **BadRequestHTTPException.open_api("Invalid cursor"),
+    },
+}
@@ -1,10 +1,17 @@
-from ...exceptions import BadRequestHTTPException, NotFoundHTTPException
+from ...exceptions import BadRequestHTTPException, ConflictHTTPException, NotFoundHTTPException
 from ...schemas.chapter import ChapterResponse
-from ...schemas.upload import UploadedBlobResponse, UploadSessionResponse
+from ...schemas.upload import SliceJobResponse, UploadedBlobResponse, UploadSessionResponse
 from .auth import auth_responses, needs_auth
 
 needs_auth = needs_auth
 
+slicing_responses = {
+    409: {
+        "description": "The pages of the upload session are being sliced",
+        **ConflictHTTPException.open_api("The pages of the upload session are being sliced"),
+    },
+}
+
 post_responses = {
     **auth_responses,
     404: {
@@ -53,6 +60,7 @@ post_blobs_responses = {
 
 delete_responses = {
     **get_responses,
+    **slicing_responses,
     200: {
         "description": "The upload session was deleted",
         "content": {
@@ -65,6 +73,7 @@ delete_responses = {
 
 post_commit_responses = {
     **auth_responses,
+    **slicing_responses,
     400: {
         "description": "There is a problem with the provided page order",
         **BadRequestHTTPException.open_api("Some pages don't belong to this session"),
@@ -85,6 +94,7 @@ post_commit_responses = {
 
 delete_all_blobs_responses = {
     **get_responses,
+    **slicing_responses,
     200: {
         "description": "All the uploaded images were deleted",
         "content": {
@@ -97,6 +107,7 @@ delete_all_blobs_responses = {
 
 delete_blob_responses = {
     **get_responses,
+    **slicing_responses,
     400: {
         "description": "That file doesn't exist in the provided upload session",
         **BadRequestHTTPException.open_api("The blob doesn't exist in the session"),
@@ -113,6 +124,7 @@ delete_blob_responses = {
 
 slice_blobs_responses = {
     **auth_responses,
+    **slicing_responses,
     400: {
         "description": "There is a problem with the provided page order",
         **BadRequestHTTPException.open_api("Some pages don't belong to this session"),
@@ -121,8 +133,20 @@ slice_blobs_responses = {
         "description": "The upload session couldn't be found",
         **NotFoundHTTPException.open_api("Session not found"),
     },
-    201: {
-        "description": "The created blobs",
-        "model": list[UploadedBlobResponse],
+    202: {
+        "description": "The slice job, the pages are sliced in the background",
+        "model": SliceJobResponse,
+    },
+}
+
+get_slice_job_responses = {
+    **auth_responses,
+    404: {
+        "description": "The upload session/job couldn't be found",
+        **NotFoundHTTPException.open_api_list({"Session": "Session not found", "Job": "Job not found"}),
+    },
+    200: {
+        "description": "The requested slice job",
+        "model": SliceJobResponse,
     },
 }
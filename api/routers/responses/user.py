@@ -1,6 +1,7 @@
 from ...exceptions import BadRequestHTTPException, NotFoundHTTPException
 from ...schemas.user import UserResponse, UsersResponse
 from .auth import auth_responses, needs_auth
+from .pagination import cursor_responses
 
 needs_auth = needs_auth
 
@@ -78,6 +79,7 @@ register_responses = {
 
 get_all_responses = {
     **auth_responses,
+    **cursor_responses,
     200: {
         "description": "The created user",
         "model": UsersResponse,
@@ -1,5 +1,3 @@
-from tempfile import TemporaryFile
-from typing import List
 from uuid import UUID
 
 from fastapi import APIRouter, BackgroundTasks, Depends, File, UploadFile, status
@@ -10,9 +8,14 @@ from fastapi_permissions import has_permission, permission_exception
 from ..config import get_settings
 from ..db import db, models
 from ..exceptions import BadRequestHTTPException, NotFoundHTTPException
-from ..media import media
 from ..schemas.chapter import ChapterResponse
-from ..schemas.upload import CommitUploadSession, UploadedBlobResponse, UploadSessionResponse, UploadSessionSchema
+from ..schemas.upload import (
+    CommitUploadSession,
+    SliceJobResponse,
+    UploadedBlobResponse,
+    UploadSessionResponse,
+    UploadSessionSchema,
+)
 from ..utils import logger
 from .auth import Permission, get_active_principals, is_connected
 from .responses import upload as responses
@@ -21,9 +24,12 @@ from .utils import upload as utils
 global_settings = get_settings()
 UploadSession = models.upload.UploadSession
 UploadedBlob = models.upload.UploadedBlob
+SliceJob = models.upload.SliceJob
+JobStatus = models.upload.JobStatus
 User = models.user.User
 Manga = models.manga.Manga
 Chapter = models.chapter.Chapter
+MediaObject = models.media.MediaObject
 
 router = APIRouter(prefix="/upload", tags=["Upload"])
 
@@ -72,9 +78,8 @@ async def begin_upload_session(
 
     if chapter:
         logger.debug(f"Upload session {session.id}: Edit mode")
-        blobs = await utils.uploaded_blob_list(db_session, session.id, chapter.length)
+        blobs = await utils.copy_chapter_to_session(db_session, session.id, chapter)
         logger.debug(f"Upload session {session.id}: blobs = {blobs}")
-        utils.copy_chapter_to_session(chapter, blobs)
 
     return await UploadSession.find_detailed(db_session, session.id)
 
@@ -108,22 +113,19 @@ async def upload_pages_to_upload_session(
 
     tmp = utils.TempDir(session.id)
 
-    blobs = []
+    transcoded = []
     for file in payload:
         if file.content_type in utils.compressed_formats:
-            files = await utils.decompress_file(file, tmp.zip, tmp.files)
+            files = utils.decompress_file(file, tmp.zip, tmp.files)
         else:
-            files = await utils.save_single_file(file, tmp.files)
+            files = utils.save_single_file(file, tmp.files)
 
-        file_blobs: List[UUID] = []
-        for f in files:
-            file_blob = UploadedBlob(session_id=session.id, name=f)
-            await file_blob.save(db_session)
+        transcoded += await utils.transcode_files(files)
 
-            blobs.append(file_blob)
-            file_blobs.append(file_blob.id)
+    blobs = [UploadedBlob(session_id=session.id, name=name, hash=digest) for name, _, digest in transcoded]
+    await UploadedBlob.save_many(db_session, blobs)
 
-        utils.save_session_image(zip(file_blobs, (tmp.files_join(f) for f in files)))
+    await utils.save_session_image(zip((b.id for b in blobs), (f for _, f, _ in transcoded)))
 
     return blobs
 
@@ -132,6 +134,8 @@ async def upload_pages_to_upload_session(
 async def delete_upload_session(
     tasks: BackgroundTasks, session=Permission("edit", _get_upload_session_blobs), db_session=Depends(db.db_session)
 ):
+    await utils.ensure_no_active_job(db_session, session.id)
+
     session_images = (b.id for b in session.blobs)
     await session.delete()
 
@@ -155,6 +159,8 @@ async def commit_upload_session(
     blobs = set(b.id for b in session.blobs)
     edit = session.chapter_id is not None
 
+    await utils.ensure_no_active_job(db_session, session.id)
+
     if not len(payload.page_order) > 0:
         raise BadRequestHTTPException("At least one page needs to be provided")
     if len(payload.page_order) != len(set(payload.page_order)):
@@ -162,23 +168,57 @@ async def commit_upload_session(
     if len(set(payload.page_order).difference(blobs)) > 0:
         raise BadRequestHTTPException("Some pages don't belong to this session")
 
+    hashes = {b.id: b.hash for b in session.blobs}
+    page_hashes = [hashes[page] for page in payload.page_order]
+    # The pages are only content-addressed if all their hashes are known
+    content_addressed = global_settings.content_addressed_pages and all(page_hashes)
+
+    # The pages are saved in the current format, their renditions are recorded once the commit generated them
+    media_fields = {
+        "renditions": [],
+        "extension": utils.encoder.extension,
+        "pages": page_hashes if content_addressed else [],
+    }
+
     if edit:
         chapter = await Chapter.find(db_session, session.chapter_id, NotFoundHTTPException("Chapter not found"))
-        await chapter.update(db_session, length=len(payload.page_order), **payload.chapter_draft.dict())
+        # Each commit gets its own version, even when the same chapter is committed concurrently
+        media_version = await Chapter.next_media_version(db_session, chapter)
+        previous_pages = chapter.pages
+        previous_files = utils.chapter_files(chapter)
+        await chapter.update(
+            db_session,
+            length=len(payload.page_order),
+            media_version=media_version,
+            **media_fields,
+            **payload.chapter_draft.dict(),
+        )
     else:
         chapter = Chapter(
             manga_id=session.manga_id,
             length=len(payload.page_order),
             owner_id=session.owner_id,
+            media_version=1,
+            **media_fields,
             **payload.chapter_draft.dict(),
         )
         await chapter.save(db_session)
+        previous_pages = []
+        previous_files = [], []
+
+    # The new pages are referenced before the previous ones are released, so the unchanged ones are kept
+    await MediaObject.acquire(db_session, chapter.pages, chapter.extension)
+    released = await MediaObject.release(db_session, previous_pages)
 
     utils.TempDir(session.id).rm()
     await session.delete(db_session)
 
-    tasks.add_task(utils.commit_blobs, chapter, payload.page_order, edit)
+    # The chapter points to the new version right away, its pages are missing until the background commit saved
+    # them (they're not found in the meantime). The previous version is removed after that.
+    tasks.add_task(utils.commit_blobs, chapter, payload.page_order)
+    tasks.add_task(utils.delete_chapter_files, *previous_files)
     tasks.add_task(utils.delete_blobs, blobs.difference(payload.page_order))
+    tasks.add_task(utils.delete_objects, released)
 
     content = jsonable_encoder(ChapterResponse.from_orm(chapter))
     return ORJSONResponse(status_code=(200 if edit else 201), content=content)
@@ -192,6 +232,8 @@ async def delete_all_pages_from_upload_session(
     session=Permission("edit", _get_upload_session_blobs),
     db_session=Depends(db.db_session),
 ):
+    await utils.ensure_no_active_job(db_session, session.id)
+
     session_images = set(b.id for b in session.blobs)
     tasks.add_task(utils.delete_blobs, session_images)
 
@@ -210,6 +252,7 @@ async def delete_page_from_upload_session(
 ):
     if file_id not in (b.id for b in session.blobs):
         raise BadRequestHTTPException("The blob doesn't exist in the session")
+    await utils.ensure_no_active_job(db_session, session.id)
 
     blob = await UploadedBlob.find(db_session, file_id, NotFoundHTTPException("Blob not found"))
     await blob.delete(db_session)
@@ -220,8 +263,8 @@ async def delete_page_from_upload_session(
 
 @router.post(
     "/{session_id}/slice",
-    status_code=status.HTTP_201_CREATED,
-    response_model=List[UploadedBlobResponse],
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=SliceJobResponse,
     responses=responses.slice_blobs_responses,
     openapi_extra=responses.needs_auth,
 )
@@ -231,30 +274,46 @@ async def slice_pages_in_upload_session(
     session: UploadSession = Permission("edit", _get_upload_session_blobs),
     db_session=Depends(db.db_session),
 ):
+    """
+    Joins the provided pages and cuts them in parts with a 1:2 ratio, the parts replace the pages once done.
+    The slicing happens in the background, its progress can be followed with the returned job.
+    """
     blobs = set(b.id for b in session.blobs)
 
     if not len(payload) > 0:
         raise BadRequestHTTPException("At least one page needs to be provided")
     if len(set(payload).difference(blobs)) > 0:
         raise BadRequestHTTPException("Some pages don't belong to this session")
+    # Only one job rewrites the pages of the session at a time
+    await utils.ensure_no_active_job(db_session, session.id)
 
-    parts = utils.concat_and_cut_images(payload)
-
-    for i, part in enumerate(parts):
-        file_blob = UploadedBlob(session_id=session.id, name=f"slice_{i+1}.jpg")
-        await file_blob.save(db_session)
+    job = SliceJob(session_id=session.id, total=len(payload))
+    await job.save(db_session)
+    logger.debug(f"Upload session {session.id}: slice job {job.id} created")
 
-        with TemporaryFile() as f:
-            part.save(f, "JPEG")
-            f.seek(0)
-            media.media.put(f"blobs/{file_blob.id}.jpg", f)
+    tasks.add_task(utils.run_slice_job, job.id, session.id, payload)
+    return job
 
-        part.close()
 
-    for blob_id in payload:
-        blob: UploadedBlob = await UploadedBlob.find(db_session, blob_id)
-        await blob.delete(db_session)
+@router.get(
+    "/{session_id}/slice/{job_id}",
+    response_model=SliceJobResponse,
+    responses=responses.get_slice_job_responses,
+    openapi_extra=responses.needs_auth,
+)
+async def get_slice_job(
+    job_id: UUID,
+    session: UploadSession = Permission("view", _get_upload_session),
+    db_session=Depends(db.db_session),
+):
+    job = await SliceJob.find(db_session, job_id, NotFoundHTTPException("Job not found"))
+    if job.session_id != session.id:
+        raise NotFoundHTTPException("Job not found")
 
-    tasks.add_task(utils.delete_blobs, payload)
+    job = await utils.fail_stale_job(db_session, job)
+    if job.status == JobStatus.done:
+        blobs = await UploadedBlob.from_session(db_session, session.id)
+    else:
+        blobs = None
 
-    return await UploadedBlob.from_session(db_session, session.id)
+    return {**SliceJobResponse.from_orm(job).dict(), "blobs": blobs}
@@ -1,19 +1,20 @@
-from tempfile import TemporaryFile
 from typing import Optional
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, File, Query, Request, UploadFile, status
 from fastapi_permissions import has_permission
-from PIL import Image
+
+from db_adapters import CountMode
 
 from ..config import get_settings
 from ..db import db, models
 from ..exceptions import BadRequestHTTPException, NotFoundHTTPException
 from ..limiter import limiter
-from ..media import media
 from ..schemas.user import UserEditSchema, UserFilters, UserRegisterSchema, UserResponse, UserSchema, UsersResponse
 from .auth import Permission, get_active_principals, is_connected, password_hash
 from .responses import user as responses
+from .utils.images import save_image
+from .utils.pagination import COUNT_DESCRIPTION, CURSOR_DESCRIPTION, decode_cursor, encode_cursor
 
 global_settings = get_settings()
 User = models.user.User
@@ -137,6 +138,8 @@ if global_settings.allow_registration:
 async def search_users(
     limit: Optional[int] = Query(10, ge=1, le=global_settings.max_page_limit),
     offset: Optional[int] = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    count: CountMode = Query(CountMode.exact, description=COUNT_DESCRIPTION),
     username: str = "",
     role: Optional[Role] = None,
     email: Optional[str] = None,
@@ -144,24 +147,27 @@ async def search_users(
     _: User = Permission("view", User.__class_acl__),
     db_session=Depends(db.db_session),
 ):
-    count, page = await User.search(
-        db_session, username, UserFilters(role=role, email=email, id=user_id), limit, offset
+    total, page, next_cursor = await User.search(
+        db_session,
+        username,
+        UserFilters(role=role, email=email, id=user_id),
+        limit,
+        offset,
+        decode_cursor(cursor),
+        count,
     )
 
     return {
-        "offset": offset,
+        "offset": None if cursor else offset,
         "limit": limit,
         "results": page,
-        "total": count,
+        "total": total,
+        "next_cursor": encode_cursor(next_cursor),
     }
 
 
-def save_avatar(user_id: UUID, file: File):
-    im = Image.open(file)
-    with TemporaryFile() as f:
-        im.convert("RGB").save(f, "JPEG")
-        f.seek(0)
-        media.media.put(f"users/{user_id}.jpg", f)
+async def save_avatar(user_id: UUID, file: File):
+    await save_image(f"users/{user_id}", file)
 
 
 @router.put("/{user_id}/avatar", responses=responses.put_avatar_responses, openapi_extra=responses.needs_auth)
@@ -173,7 +179,7 @@ async def set_avatar(
     if not payload.content_type.startswith("image/"):
         raise BadRequestHTTPException(f"'{payload.filename}' is not an image")
 
-    save_avatar(user.id, payload.file)
+    await save_avatar(user.id, payload.file)
     await user.save(db_session)
 
     return user
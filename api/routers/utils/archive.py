@@ -0,0 +1,67 @@
+from enum import Enum
+from typing import Iterator
+from zipfile import ZIP_STORED, ZipFile, ZipInfo
+
+from ...db import models
+from ...media import media, page_path
+
+Chapter = models.chapter.Chapter
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ArchiveFormat(str, Enum):
+    cbz = "cbz"
+    zip = "zip"
+
+
+media_types = {
+    ArchiveFormat.cbz: "application/vnd.comicbook+zip",
+    ArchiveFormat.zip: "application/zip",
+}
+
+
+class _Stream:
+    """
+    Unseekable file the archive is written to, the bytes written are kept until they're sent.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data: bytes):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def chapter_archive(chapter: Chapter) -> Iterator[bytes]:
+    """
+    Generates a store-only ZIP of the pages of the chapter, read one chunk at a time from the media.
+    The archive is written to an unseekable stream, so the sizes of the entries come after their data.
+    """
+    stream = _Stream()
+    width = len(str(chapter.length))
+    date_time = chapter.upload_time.timetuple()[:6]
+
+    with ZipFile(stream, "w", ZIP_STORED) as archive:
+        for page in range(1, chapter.length + 1):
+            info = ZipInfo(f"{page:0{width}}.{chapter.extension}", date_time)
+            file = media.media.get(page_path(chapter, page))
+            try:
+                with archive.open(info, "w") as entry:
+                    while chunk := file.read(CHUNK_SIZE):
+                        entry.write(chunk)
+                        if data := stream.pop():
+                            yield data
+            finally:
+                file.close()
+
+    yield stream.pop()
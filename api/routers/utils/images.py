@@ -0,0 +1,33 @@
+from tempfile import TemporaryFile
+from typing import BinaryIO
+
+from PIL import Image
+from starlette.concurrency import run_in_threadpool
+
+from ...config import get_settings
+from ...images import ImageEncoder, ImageFormat
+from ...media import media
+
+global_settings = get_settings()
+encoder = global_settings.image_encoder
+jpeg_encoder = encoder.copy(update={"format": ImageFormat.jpeg})
+
+
+def _encode(im: Image.Image, encoder: ImageEncoder):
+    f = TemporaryFile()
+    encoder.save(im, f)
+    f.seek(0)
+    return f
+
+
+async def save_image(name: str, file: BinaryIO):
+    """
+    Saves the image as `{name}.{ext}` with the configured encoder.
+    A JPEG version is always saved in `{name}.jpg`, so the clients that only know that path keep working.
+    """
+    im = await run_in_threadpool(Image.open, file)
+
+    encoders = [encoder] if encoder.format == ImageFormat.jpeg else [encoder, jpeg_encoder]
+    for enc in encoders:
+        with await run_in_threadpool(_encode, im, enc) as f:
+            await media.media.aput(f"{name}.{enc.extension}", f)
@@ -0,0 +1,34 @@
+import base64
+import json
+from typing import Optional
+
+from fastapi.encoders import jsonable_encoder
+
+from ...exceptions import BadRequestHTTPException
+
+CURSOR_DESCRIPTION = "Cursor of the page, the `nextCursor` of the previous one (`offset` is ignored with it)"
+COUNT_DESCRIPTION = "How the `total` is computed, `estimated` is much cheaper for the big listings"
+
+
+def encode_cursor(values: Optional[list]) -> Optional[str]:
+    """
+    Opaque version of the cursor returned by the database (the sort keys of the last result of the page).
+    """
+    if values is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(jsonable_encoder(values), separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[list]:
+    """
+    Sort keys of the cursor provided by the client, the database converts them back to the types of the keys.
+    """
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor))
+    except ValueError:
+        raise BadRequestHTTPException("Invalid cursor")
+    if not isinstance(values, list):
+        raise BadRequestHTTPException("Invalid cursor")
+    return values
@@ -1,59 +1,138 @@
-from math import ceil
+import asyncio
+import tarfile
+from datetime import datetime, timedelta
 from os import listdir, makedirs, path, remove
-from shutil import rmtree
-from tempfile import TemporaryFile
-from typing import Iterable, List, Union
-from uuid import UUID
-
-from aiofiles import open
-from fastapi import UploadFile
+from shutil import copyfileobj, rmtree
+from tempfile import TemporaryDirectory, TemporaryFile
+from typing import AsyncIterator, Awaitable, BinaryIO, Callable, Dict, Iterable, Iterator, Optional, Union
+from uuid import UUID, uuid4
+from zipfile import ZipFile, is_zipfile
+
+import aiofiles
+from fastapi import HTTPException, UploadFile
 from PIL import Image
 from pyunpack import Archive
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 
+from ... import images
 from ...config import get_settings
-from ...db import models
-from ...exceptions import BadRequestHTTPException
-from ...media import media
+from ...db import db, models
+from ...exceptions import BadRequestHTTPException, ConflictHTTPException
+from ...media import chapter_folder, media, page_path
+from ...utils import logger
+from ...workers import run_in_pool
 
 global_settings = get_settings()
 Chapter = models.chapter.Chapter
 UploadedBlob = models.upload.UploadedBlob
+SliceJob = models.upload.SliceJob
+JobStatus = models.upload.JobStatus
+MediaObject = models.media.MediaObject
+encoder = global_settings.image_encoder
 
 TEN_KB = 10 * 1024
+ONE_MB = 1024 * 1024
 
 
-compressed_formats = (
-    "application/x-7z-compressed",
-    "application/x-xz",
+zip_formats = (
     "application/zip",
     "application/x-zip-compressed",
+)
+
+tar_formats = (
+    "application/x-tar",
+    "application/x-xz",
+    "application/gzip",
+)
+
+compressed_formats = (
+    *zip_formats,
+    *tar_formats,
+    "application/x-7z-compressed",
     "application/x-rar-compressed",
     "application/vnd.rar",
 )
 
 
-async def uploaded_blob_list(db_session, session_id: UUID, length: int) -> list[UUID]:
-    blobs = []
-    for i in range(1, length + 1):
-        blob = UploadedBlob(session_id=session_id, name=f"{i}.jpg")
-        await blob.save(db_session)
-        blobs.append(blob.id)
-    return blobs
-
+def blob_path(blob_id: UUID):
+    return f"blobs/{blob_id}.{encoder.extension}"
+
+
+async def copy_chapter_to_session(db_session, session_id: UUID, chapter: Chapter) -> list[UUID]:
+    """
+    Adds the pages of the chapter to the upload session as new blobs, returns their ids.
+    The hashes of the pages that aren't content-addressed yet are only computed if they're needed to commit them.
+    The pages are copied by the storage when it can, otherwise each of them is only downloaded once.
+    """
+    ids = [uuid4() for _ in range(chapter.length)]
+    pages = [(page_path(chapter, i + 1), blob_path(blob_id)) for i, blob_id in enumerate(ids)]
+
+    if chapter.extension != encoder.extension:
+        # The chapter was saved in another format, its pages are converted so all the blobs share the same one
+        async def convert(local: str, dest: str):
+            digest = await run_in_pool(images.transcode, local, f"{local}.out", encoder)
+            with open(f"{local}.out", "rb") as f:
+                await media.media.aput(dest, f)
+            remove(f"{local}.out")
+            return digest
+
+        hashes = await _process_media(pages, convert)
+    elif not chapter.pages and global_settings.content_addressed_pages and not media.media.server_side_copy:
+        # The pages are downloaded to be hashed anyway, they're uploaded from there instead of being copied
+        async def upload(local: str, dest: str):
+            with open(local, "rb") as f:
+                await media.media.aput(dest, f)
+            return await run_in_threadpool(images.file_digest, local)
+
+        hashes = await _process_media(pages, upload)
+    else:
+        await media.media.link_many(pages)
+
+        if chapter.pages:
+            hashes = chapter.pages
+        elif global_settings.content_addressed_pages:
+            hashes = await _process_media(pages, lambda local, _: run_in_threadpool(images.file_digest, local))
+        else:
+            hashes = [None] * chapter.length
+
+    blobs = [
+        UploadedBlob(id=blob_id, session_id=session_id, name=f"{i + 1}.{encoder.extension}", hash=digest)
+        for i, (blob_id, digest) in enumerate(zip(ids, hashes))
+    ]
+    await UploadedBlob.save_many(db_session, blobs)
+    return ids
+
+
+async def transcode_files(files: AsyncIterator[tuple[str, str]]) -> list[tuple[str, str, str]]:
+    """
+    Sends each file to the transcoding pool as soon as it's available.
+    Returns the names of the files with the path and the hash of their transcoded version.
+    """
+    sources = []
+    tasks = []
+    try:
+        async for name, file in files:
+            sources.append((name, file))
+            tasks.append(asyncio.ensure_future(run_in_pool(images.transcode, file, f"{file}.out", encoder)))
+        hashes = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    for _, file in sources:
+        remove(file)
 
-def copy_chapter_to_session(chapter: Chapter, blobs: List[UUID]):
-    chapter_path = f"{chapter.manga_id}/{chapter.id}/"
-    for i in range(chapter.length):
-        media.media.copy(chapter_path + f"{i + 1}.jpg", f"blobs/{blobs[i]}.jpg")
+    return [(name, f"{file}.out", digest) for (name, file), digest in zip(sources, hashes)]
 
 
-def save_session_image(files: Iterable[tuple[UUID, str]]):
+async def save_session_image(files: Iterable[tuple[UUID, str]]):
+    """
+    Saves the transcoded files as the provided blobs.
+    """
     for blob_id, file in files:
-        im = Image.open(file)
-        with TemporaryFile() as f:
-            im.convert("RGB").save(f, "JPEG")
-            f.seek(0)
-            media.media.put(f"blobs/{blob_id}.jpg", f)
+        with open(file, "rb") as f:
+            await media.media.aput(blob_path(blob_id), f)
         remove(file)
 
 
@@ -67,81 +146,395 @@ def valid_mime(content_type: str):
 
 
 async def save_single_file(file: UploadFile, out_dir: str):
-    async with open(path.join(out_dir, file.filename), "wb") as out_file:
+    dest = path.join(out_dir, uuid4().hex)
+    async with aiofiles.open(dest, "wb") as out_file:
         while chunk := await file.read(TEN_KB):
             await out_file.write(chunk)
-    return (file.filename,)
+    yield file.filename, dest
 
 
-async def decompress_file(file: UploadFile, tmp_dir: str, out_dir: str):
-    zip_path = path.join(tmp_dir, file.filename)
-    # PyUnpack needs the compressed file to be somewhere in the FS
-    async with open(zip_path, "wb") as zip_file:
-        while chunk := await file.read(TEN_KB):
-            await zip_file.write(chunk)
+def _extract_entry(entry: BinaryIO, out_dir: str):
+    dest = path.join(out_dir, uuid4().hex)
+    with open(dest, "wb") as out_file:
+        copyfileobj(entry, out_file, ONE_MB)
+    return dest
 
-    Archive(zip_path).extractall(out_dir, True)
-    remove(zip_path)
 
-    files = listdir(out_dir)
-    return [f for f in files if path.isfile(path.join(out_dir, f)) and valid_image_extension(f)]
+def _extract_zip(file: BinaryIO, out_dir: str) -> Iterator[tuple[str, str]]:
+    with ZipFile(file) as archive:
+        for info in archive.infolist():
+            name = path.basename(info.filename)
+            if info.is_dir() or not valid_image_extension(name):
+                continue
 
+            with archive.open(info) as entry:
+                yield name, _extract_entry(entry, out_dir)
 
-def delete_blobs(ids: list[UUID]):
-    media.media.remove_many([path.join("blobs", f"{blob_id}.jpg") for blob_id in ids])
 
+def _open_tar(file: BinaryIO):
+    try:
+        # Stream mode reads the entries sequentially, without seeking back in the file
+        return tarfile.open(fileobj=file, mode="r|*")
+    except tarfile.ReadError:
+        file.seek(0)
+        return None
 
-def commit_blobs(chapter: Chapter, pages: list[UUID], edit: bool):
-    chapter_path = f"{chapter.manga_id}/{chapter.id}"
 
-    if edit:
-        media.media.rmtree(chapter_path)
+def _extract_tar(archive: tarfile.TarFile, out_dir: str) -> Iterator[tuple[str, str]]:
+    with archive:
+        for info in archive:
+            name = path.basename(info.name)
+            if not info.isfile() or not valid_image_extension(name):
+                continue
 
-    for i, page in enumerate(pages):
-        media.media.move(f"blobs/{page}.jpg", path.join(chapter_path, f"{i + 1}.jpg"))
+            with archive.extractfile(info) as entry:
+                yield name, _extract_entry(entry, out_dir)
 
 
-def image_list(blobs: Iterable[UUID]):
-    images = []
-    temp_files = []
-    for blob_id in blobs:
-        fd = media.media.get(path.join("blobs", f"{blob_id}.jpg"))
+def _extract_pyunpack(file: BinaryIO, tmp_dir: str) -> Iterator[tuple[str, str]]:
+    zip_path = path.join(tmp_dir, uuid4().hex)
+    # PyUnpack needs the compressed file to be somewhere in the FS
+    file.seek(0)
+    with open(zip_path, "wb") as zip_file:
+        copyfileobj(file, zip_file, ONE_MB)
 
-        f = TemporaryFile()
-        while chunk := fd.read(TEN_KB):
-            f.write(chunk)
-        fd.close()
-        f.seek(0)
+    extract_dir = path.join(tmp_dir, uuid4().hex)
+    makedirs(extract_dir)
+    Archive(zip_path).extractall(extract_dir, True)
+    remove(zip_path)
 
-        images.append(Image.open(f))
-        temp_files.append(f)
+    for f in listdir(extract_dir):
+        if path.isfile(path.join(extract_dir, f)) and valid_image_extension(f):
+            yield f, path.join(extract_dir, f)
 
-    return images, temp_files
 
+def _extract_archive(file: UploadFile, tmp_dir: str, out_dir: str) -> Iterator[tuple[str, str]]:
+    """
+    Reads the images of the archive straight from the upload, the other files are never written.
+    Formats that can't be streamed (7z, rar...) are spooled to disk and extracted by pyunpack.
+    """
+    if file.content_type in zip_formats and is_zipfile(file.file):
+        yield from _extract_zip(file.file, out_dir)
+    elif file.content_type in tar_formats and (archive := _open_tar(file.file)):
+        yield from _extract_tar(archive, out_dir)
+    else:
+        yield from _extract_pyunpack(file.file, tmp_dir)
 
-def concat_and_cut_images(blobs: Iterable[UUID]):
-    images, temp_files = image_list(blobs)
-    height = sum(img.height for img in images)
 
-    if not all(images[0].width == img.width for img in images):
-        raise BadRequestHTTPException("All the images should have the same width")
+async def decompress_file(file: UploadFile, tmp_dir: str, out_dir: str):
+    """
+    Extracts the images of the archive in a thread, yielding them as soon as they are written.
+    """
+    async for name, dest in iterate_in_threadpool(_extract_archive(file, tmp_dir, out_dir)):
+        yield name, dest
+
+
+async def delete_blobs(ids: list[UUID]):
+    await media.media.aremove_many([blob_path(blob_id) for blob_id in ids])
+
+
+async def delete_objects(hashes: list[str]):
+    """
+    Removes the released content-addressed objects from the media (with their renditions) and the database.
+    The ones acquired again by a commit since they were released are kept.
+    """
+    if not hashes:
+        return
+
+    async for db_session in db.db_session():
+        unused = await MediaObject.lock_unused(db_session, hashes)
+        await media.media.rmtree_many(media.media.object_dir(digest) for digest in unused)
+        await MediaObject.delete_unused(db_session, unused)
+
+
+async def release_pages(db_session, chapters: Iterable[Chapter]):
+    """
+    Removes the references of the chapters to their content-addressed pages, the unused objects are deleted.
+    """
+    released = await MediaObject.release(db_session, [digest for chapter in chapters for digest in chapter.pages])
+    await delete_objects(released)
+
+
+def rendition_path(page_path: str, rendition: str):
+    """
+    Path of a smaller version of a page, they're saved in a folder named after the rendition next to the page.
+    """
+    return path.join(path.dirname(page_path), rendition, path.basename(page_path))
+
+
+async def _process_media(files: Iterable[tuple[str, str]], process: Callable[[str, str], Awaitable]):
+    """
+    Downloads the source of each (source, dest) pair to a local file, then awaits `process(local path, dest)`.
+    At most `media.concurrency` files are processed at the same time, the sources are left untouched.
+    Returns the results of `process`, in order.
+    """
+    semaphore = asyncio.Semaphore(media.media.concurrency)
+
+    async def download(source: str, dest: str, tmp_dir: str):
+        async with semaphore:
+            local = path.join(tmp_dir, uuid4().hex)
+            with open(local, "wb") as f:
+                await run_in_threadpool(_download, source, f)
+            result = await process(local, dest)
+            remove(local)
+            return result
+
+    with TemporaryDirectory(dir=global_settings.temp_path) as tmp_dir:
+        return await asyncio.gather(*(download(source, dest, tmp_dir) for source, dest in files))
+
+
+async def save_renditions(pages: list[tuple[str, str]], renditions: Dict[str, int], upload: bool = False):
+    """
+    Generates the renditions of each (source, page path) pair in the transcoding pool.
+    The renditions are saved next to the page path, the sources are left untouched.
+    With `upload`, the downloaded source is also saved as the page itself.
+    """
+
+    async def render(local: str, page_path: str):
+        if upload:
+            with open(local, "rb") as f:
+                await media.media.aput(page_path, f)
+
+        await asyncio.gather(
+            *(
+                run_in_pool(images.resize, local, f"{local}.{name}", width, encoder)
+                for name, width in renditions.items()
+            )
+        )
+
+        for name in renditions:
+            with open(f"{local}.{name}", "rb") as f:
+                await media.media.aput(rendition_path(page_path, name), f)
+            remove(f"{local}.{name}")
+
+    await _process_media(pages, render)
+
+
+def chapter_files(chapter: Chapter) -> tuple[list[str], list[str]]:
+    """
+    Files and folders holding the pages of the chapter (with their renditions), none if they're content-addressed.
+    """
+    if chapter.pages:
+        return [], []
+    if chapter.media_version:
+        return [], [chapter_folder(chapter)]
+    pages = [page_path(chapter, i + 1) for i in range(chapter.length)]
+    return pages, [f"{chapter_folder(chapter)}/{rendition}" for rendition in chapter.renditions]
+
+
+async def delete_chapter_files(files: list[str], folders: list[str]):
+    """
+    Removes a previous version of the pages of a chapter, once the new one is saved.
+    """
+    await media.media.rmtree_many(folders)
+    await media.media.aremove_many(files)
+
+
+async def commit_blobs(chapter: Chapter, pages: list[UUID]):
+    """
+    Moves the blobs of the pages to their place in the media, after generating the renditions of the current settings.
+    The pages are saved in the folder of the chapter's media version, so the files of the previous one never change.
+    Content-addressed chapters save the objects that aren't stored yet, even if another commit is saving them at the
+    same time (their content is the same), they're only marked as stored once saved. The stored objects only get the
+    renditions they're missing, generated from the blobs. The other blobs are removed.
+    Storages that can't move the files themselves download each blob once, to upload it and its renditions.
+    The renditions are only recorded in the chapter once they're all saved.
+    """
+    renditions = dict(global_settings.page_renditions)
+    if chapter.pages:
+        # Blob saved for each content, the first page with it is used when a chapter contains the same one twice
+        blobs = {}
+        for page, digest in zip(pages, chapter.pages):
+            blobs.setdefault(digest, page)
+
+        async for db_session in db.db_session():
+            objects = await MediaObject.from_hashes(db_session, list(blobs))
+        # The objects released in the meantime aren't saved
+        unstored = [obj.hash for obj in objects if not obj.stored]
+        # Objects saved under other rendition settings, grouped by the renditions they're missing
+        missing = {}
+        for obj in objects:
+            if obj.stored and (names := frozenset(renditions).difference(obj.renditions)):
+                missing.setdefault(names, []).append(obj.hash)
+
+        page_paths = [
+            (blob_path(blobs[digest]), media.media.object_path(digest, chapter.extension)) for digest in unstored
+        ]
+        saved = {blobs[digest] for digest in unstored}
+        leftovers = [page for page in pages if page not in saved]
+    else:
+        page_paths = [(blob_path(page), page_path(chapter, i + 1)) for i, page in enumerate(pages)]
+        leftovers = []
+        missing = {}
+
+    if media.media.server_side_move:
+        if renditions:
+            await save_renditions(page_paths, renditions)
+        await media.media.move_many(page_paths)
+    else:
+        await save_renditions(page_paths, renditions, upload=True)
+        await media.media.aremove_many([source for source, _ in page_paths])
+
+    for names, digests in missing.items():
+        object_paths = [
+            (blob_path(blobs[digest]), media.media.object_path(digest, chapter.extension)) for digest in digests
+        ]
+        await save_renditions(object_paths, {name: renditions[name] for name in names})
+
+    if chapter.pages:
+        completed = unstored + [digest for digests in missing.values() for digest in digests]
+        async for db_session in db.db_session():
+            await MediaObject.mark_stored(db_session, completed, list(renditions))
+
+    async for db_session in db.db_session():
+        await Chapter.record_renditions(db_session, chapter.id, chapter.media_version, list(renditions))
+
+    await delete_blobs(leftovers)
+
+
+def _download(name: str, out_file: BinaryIO):
+    fd = media.media.get(name)
+    while chunk := fd.read(TEN_KB):
+        out_file.write(chunk)
+    fd.close()
+    out_file.seek(0)
+
+
+def slice_images(blobs: Iterable[UUID]) -> Iterator[tuple[int, Image.Image]]:
+    """
+    Joins the images vertically and cuts the result in parts with a 1:2 ratio (the last one can be shorter).
+    Each part is yielded as soon as it's filled, so only the current part and the current image are kept in memory.
+    The parts come with the amount of images that have been fully read at that point.
+    """
+    width = None
+    part = None
+    filled = 0
+
+    for read, blob_id in enumerate(blobs):
+        with TemporaryFile() as f:
+            _download(blob_path(blob_id), f)
+            image = Image.open(f)
 
-    joined = Image.new("RGB", (images[0].width, height))
-    running_height = 0
-    for i, image in enumerate(images):
-        joined.paste(image, (0, running_height))
-        image.close()
-        temp_files[i].close()
-        running_height += image.height
+            if width is None:
+                width = image.width
+            elif image.width != width:
+                raise BadRequestHTTPException("All the images should have the same width")
 
-    amount_parts = ceil(joined.height / (2 * joined.width))
-    parts = []
-    for i in range(amount_parts):
-        end_y = min(height, 2 * joined.width * (i + 1))
-        part = joined.crop((0, 2 * joined.width * i, joined.width, end_y))
-        parts.append(part)
+            copied = 0
+            while copied < image.height:
+                if part is None:
+                    part = Image.new("RGB", (width, 2 * width))
+                    filled = 0
 
-    return parts
+                # Only the rows that fit are pasted, the rest of the image is clipped
+                part.paste(image, (0, filled - copied))
+                rows = min(image.height - copied, part.height - filled)
+                copied += rows
+                filled += rows
+
+                if filled == part.height:
+                    yield (read + 1 if copied == image.height else read), part
+                    part = None
+
+            image.close()
+
+    if part is not None:
+        yield read + 1, part.crop((0, 0, width, filled))
+        part.close()
+
+
+def save_slice(blob_id: UUID, part: Image.Image) -> str:
+    with TemporaryFile() as f:
+        encoder.save(part, f)
+        f.seek(0)
+        digest = images.file_digest(f)
+        f.seek(0)
+        media.media.put(blob_path(blob_id), f)
+    part.close()
+    return digest
+
+
+async def slice_session_images(
+    session_id: UUID, blobs: list[UUID], on_progress: Optional[Callable[[int], Awaitable]] = None
+) -> list[UploadedBlob]:
+    """
+    Slices the provided blobs, the parts are saved in the media as soon as they're cut.
+    `on_progress` is awaited with the amount of blobs read each time it changes.
+    Returns the (unsaved) blobs of the parts, the saved parts are removed if the slicing fails.
+    """
+    part_blobs = []
+    progress = 0
+    try:
+        async for read, part in iterate_in_threadpool(slice_images(blobs)):
+            blob_id = uuid4()
+            digest = await run_in_threadpool(save_slice, blob_id, part)
+            name = f"slice_{len(part_blobs) + 1}.{encoder.extension}"
+            part_blobs.append(UploadedBlob(id=blob_id, session_id=session_id, name=name, hash=digest))
+
+            if on_progress and read != progress:
+                progress = read
+                await on_progress(progress)
+    except BaseException:
+        await delete_blobs([b.id for b in part_blobs])
+        raise
+
+    return part_blobs
+
+
+async def run_slice_job(job_id: UUID, session_id: UUID, blobs: list[UUID]):
+    """
+    Slices the blobs of an upload session in the background, the job keeps track of the progress.
+    Once done, the sliced blobs are replaced by the parts.
+    """
+    async for db_session in db.db_session():
+        job = await SliceJob.find(db_session, job_id)
+        await job.update(db_session, status=JobStatus.running)
+
+        async def update_progress(progress: int):
+            await job.update(db_session, progress=progress)
+
+        try:
+            part_blobs = await slice_session_images(session_id, blobs, update_progress)
+            await UploadedBlob.save_many(db_session, part_blobs)
+
+            for blob_id in blobs:
+                blob = await UploadedBlob.find(db_session, blob_id, None)
+                if blob:
+                    await blob.delete(db_session)
+            await delete_blobs(blobs)
+        except HTTPException as e:
+            logger.debug(f"Slice job {job_id} failed: {e.detail}")
+            await job.update(db_session, status=JobStatus.failed, detail=e.detail)
+        except Exception:
+            logger.exception(f"Slice job {job_id} failed")
+            await job.update(db_session, status=JobStatus.failed, detail="The pages couldn't be sliced")
+        else:
+            logger.debug(f"Slice job {job_id} done")
+            await job.update(db_session, status=JobStatus.done, progress=len(blobs))
+
+
+async def fail_stale_job(db_session, job: SliceJob) -> SliceJob:
+    """
+    Fails the job if it's pending or running without any progress for `slice_job_timeout` seconds,
+    the worker running it was stopped.
+    """
+    if job.status in (JobStatus.pending, JobStatus.running):
+        elapsed = datetime.now(job.update_time.tzinfo) - job.update_time
+        if elapsed > timedelta(seconds=global_settings.slice_job_timeout):
+            logger.debug(f"Slice job {job.id} was interrupted")
+            await job.update(db_session, status=JobStatus.failed, detail="The slicing was interrupted")
+
+    return job
+
+
+async def ensure_no_active_job(db_session, session_id: UUID):
+    """
+    Raises a 409 if the pages of the upload session are being sliced.
+    """
+    for job in await SliceJob.from_session(db_session, session_id):
+        job = await fail_stale_job(db_session, job)
+        if job.status in (JobStatus.pending, JobStatus.running):
+            raise ConflictHTTPException("The pages of the upload session are being sliced")
 
 
 class TempDir:
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from fastapi_camelcase import CamelModel
 from pydantic import Field
 
@@ -7,10 +9,14 @@ global_settings = get_settings()
 
 
 class PaginationResponse(CamelModel):
-    offset: int = Field(..., ge=0)
+    # None when the page was requested with a cursor
+    offset: Optional[int] = Field(..., ge=0)
     limit: int = Field(..., ge=1, le=global_settings.max_page_limit)
     results: list
-    total: int = Field(..., ge=0)
+    # None when the results aren't counted, it can be estimated
+    total: Optional[int] = Field(..., ge=0)
+    # Cursor of the next page, None on the last one
+    next_cursor: Optional[str] = None
 
     class Config:
         orm_mode = True
@@ -1,7 +1,11 @@
 from datetime import datetime
+from types import SimpleNamespace
 from typing import List, Optional
 from uuid import UUID
 
+from pydantic import validator
+
+from ..media import media_url, page_path
 from .base import CamelModel, Field, PaginationResponse
 from .manga import ShortMangaResponse
 from .progress import ProgressTrackingSchema
@@ -47,8 +51,42 @@ class ChapterResponse(ChapterSchema):
         description="Time this chapter was uploaded",
     )
     owner_id: Optional[UUID] = Field(description="User that uploaded this chapter")
+    renditions: List[str] = Field(
+        [],
+        description="Smaller versions available for the pages, in a folder named after them next to each page",
+    )
+    extension: str = Field(
+        "jpg",
+        description="Extension of the pages",
+    )
+    media_version: int = Field(
+        0,
+        description=(
+            "Version of the pages, they're saved in `/{manga_id}/{chapter_id}/v{media_version}/{page}.{ext}` and never"
+            " change (0 for the chapters saved in `/{manga_id}/{chapter_id}/{page}.{ext}` before the versions existed)"
+        ),
+    )
+    pages: List[str] = Field(
+        [],
+        description=(
+            "Hashes of the pages if they're content-addressed, they're saved in `/objects/{hash[:2]}/{hash}/page.{ext}`"
+            " (and `/objects/{hash[:2]}/{hash}/{rendition}/page.{ext}`) instead of the chapter's folder"
+        ),
+    )
+    page_urls: List[str] = Field(
+        [],
+        description="URLs of the pages in order, they can be cached forever since a new version has new URLs",
+    )
     tracking: Optional[List[ProgressTrackingSchema]] = Field(description="The user's tracking history for the chapter")
 
+    @validator("page_urls", always=True)
+    def get_page_urls(cls, _, values):
+        # Computed from the other fields, so it's never read from the chapter
+        if any(field not in values for field in ("id", "manga_id", "length", "extension", "media_version", "pages")):
+            return []
+        chapter = SimpleNamespace(**values)
+        return [media_url(page_path(chapter, page)) for page in range(1, chapter.length + 1)]
+
     class Config:
         orm_mode = True
         schema_extra = {
@@ -64,6 +102,12 @@ class ChapterResponse(ChapterSchema):
                 "length": 15,
                 "uploadTime": "2000-08-24 00:00:00",
                 "ownerId": "6901d7f6-c4e1-4200-9dd0-a6fccc065978",
+                "renditions": ["thumbnail", "mobile"],
+                "extension": "webp",
+                "mediaVersion": 1,
+                "pageUrls": [
+                    "/media/1e01d7f6-c4e1-4102-9dd0-a6fccc065978/4abe53f4-0eaa-4f31-9210-a625fa665e23/v1/1.webp",
+                ],
             }
         }
 
@@ -1,6 +1,8 @@
 from typing import Optional
 from uuid import UUID
 
+from ..config import get_settings
+from ..db import models
 from .base import CamelModel, Field
 from .chapter import ChapterSchema
 
@@ -27,6 +29,10 @@ class UploadedBlobResponse(CamelModel):
     name: str = Field(
         description="Name the blob was uploaded as",
     )
+    extension: str = Field(
+        get_settings().image_encoder.extension,
+        description="Extension of the blob, in `/blobs/{id}.{ext}`",
+    )
 
     class Config:
         orm_mode = True
@@ -34,6 +40,7 @@ class UploadedBlobResponse(CamelModel):
             "example": {
                 "id": "eadec6fe-619f-4d7f-8328-f8a5563d3325",
                 "name": "001.png",
+                "extension": "webp",
             }
         }
 
@@ -55,3 +62,27 @@ class UploadSessionResponse(UploadSessionSchema):
 class CommitUploadSession(CamelModel):
     chapter_draft: ChapterSchema = Field(description="Details of the chapter")
     page_order: list[UUID] = Field(description="Order the pages should be uploaded in")
+
+
+class SliceJobResponse(CamelModel):
+    id: UUID = Field(description="ID of the slice job")
+    session_id: UUID = Field(description="Upload session the job works on")
+    status: models.upload.JobStatus = Field(description="Status of the job")
+    progress: int = Field(description="Amount of pages already sliced")
+    total: int = Field(description="Amount of pages to slice")
+    detail: Optional[str] = Field(description="Reason of the failure, if the job failed")
+    blobs: Optional[list[UploadedBlobResponse]] = Field(
+        description="Images of the upload session, once the job is done",
+    )
+
+    class Config:
+        orm_mode = True
+        schema_extra = {
+            "example": {
+                "id": "0c9bd6a3-1a5e-4f52-8a2b-3d0f2f7b1e44",
+                "sessionId": "116bdaa6-f62d-4b53-98b2-237adbaad788",
+                "status": models.upload.JobStatus.running,
+                "progress": 12,
+                "total": 40,
+            }
+        }
@@ -0,0 +1,38 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from multiprocessing import get_context
+
+from starlette.concurrency import run_in_threadpool
+
+from .config import get_settings
+from .utils import logger
+
+global_settings = get_settings()
+
+
+@lru_cache(1)
+def get_pool():
+    """
+    Creates the process pool used for CPU-bound tasks (image transcoding).
+    The processes are spawned so they don't inherit the event loop and connections of the worker.
+    """
+    logger.info("Starting the transcoding pool...")
+    return ProcessPoolExecutor(max_workers=global_settings.transcode_workers, mp_context=get_context("spawn"))
+
+
+async def run_in_pool(func, *args):
+    """
+    Runs `func` in the transcoding pool and waits for its result.
+    If the pool is disabled (`transcode_workers` = 0), it runs in a thread instead.
+    """
+    if global_settings.transcode_workers == 0:
+        return await run_in_threadpool(func, *args)
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_pool(), func, *args)
+
+
+def shutdown():
+    if get_pool.cache_info().currsize:
+        get_pool().shutdown()
@@ -4,3 +4,12 @@ from enum import Enum
 class DatabaseBackends(str, Enum):
     deta = "DETA"
     postgres = "POSTGRES"
+
+
+class CountMode(str, Enum):
+    # Counts the results of the listings
+    exact = "exact"
+    # Estimates their amount from the statistics of the database when it can, it's then much cheaper
+    estimated = "estimated"
+    # Doesn't count them
+    none = "none"
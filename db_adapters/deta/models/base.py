@@ -1,21 +1,28 @@
 from contextlib import asynccontextmanager
 from math import inf
-from typing import ClassVar
+from typing import ClassVar, Optional, Tuple
 from uuid import UUID, uuid4
 
 from deta import Deta
 from fastapi import HTTPException
 from fastapi.encoders import jsonable_encoder
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError, parse_obj_as
+
+from db_adapters import CountMode
 
 from ..config import get_settings
 
 settings = get_settings()
 
+# Maximum amount of items Deta accepts in a single put_many
+PUT_MANY_LIMIT = 25
+
 ErrorException = HTTPException(422, "Database error")
 
 NotFoundException = HTTPException(404, "Resource not found")
 
+InvalidCursorException = HTTPException(400, "Invalid cursor")
+
 
 @asynccontextmanager
 async def async_client(deta: Deta, db_name: str):
@@ -45,6 +52,21 @@ class Base(BaseModel):
             self.version += 1
             await db.put(jsonable_encoder(self))
 
+    @classmethod
+    async def save_many(cls, db_session: Deta, instances: list):
+        """
+        Saves all the provided instances on db, in batches.
+        The session comes from `db_session` on `session.py`
+        """
+        async with async_client(db_session, cls.db_name) as db:
+            for i in range(0, len(instances), PUT_MANY_LIMIT):
+                batch = instances[i : i + PUT_MANY_LIMIT]
+                for instance in batch:
+                    instance.version += 1
+                await db.put_many(jsonable_encoder(batch))
+
+        return instances
+
     async def delete(self, db_session: Deta):
         """
         Deletes this instance.
@@ -94,10 +116,42 @@ class Base(BaseModel):
             return [cls(**instance) for instance in all_items]
 
     @classmethod
-    async def _pagination(cls, db_session, query, limit, offset, order_by, reverse=False):
+    async def _pagination(
+        cls,
+        db_session,
+        query,
+        limit,
+        offset,
+        order_by,
+        reverse=False,
+        cursor: Optional[list] = None,
+        count: CountMode = CountMode.exact,
+    ):
+        """
+        Returns the amount of results, a page of them and the cursor of the next page (None on the last one).
+        Deta can't sort, so all the results are fetched and sorted here, the ids break the ties.
+        The amount is always exact since they're all fetched anyway, it's None if they aren't counted.
+        The page starts after the item of the `cursor` instead of skipping `offset` items when it's provided, so new
+        items don't shift the results.
+        """
         if query is None:
             query = dict()
         results = await cls._fetch(db_session, query)
-        count = len(results)
-        page = sorted(results, key=order_by, reverse=reverse)[offset : offset + limit]
-        return count, page
+        total = None if count == CountMode.none else len(results)
+
+        def key(item):
+            return order_by(item), item.id
+
+        results = sorted(results, key=key, reverse=reverse)
+        if cursor is not None:
+            offset = 0
+            if results:
+                try:
+                    last = parse_obj_as(Tuple[type(order_by(results[0])), UUID], cursor)
+                except ValidationError:
+                    raise InvalidCursorException
+                results = [item for item in results if (key(item) < last if reverse else key(item) > last)]
+
+        page = results[offset : offset + limit]
+        next_cursor = list(key(page[-1])) if len(results) > offset + limit else None
+        return total, page, next_cursor
@@ -1,12 +1,16 @@
 from datetime import datetime
-from typing import ClassVar, Optional
+from typing import ClassVar, List, Optional
 from uuid import UUID
 
+from aiohttp import ClientResponseError
 from deta import Deta
+from fastapi import status
 from fastapi_permissions import Allow, Everyone
 from pydantic import Field
 
-from .base import Base, NotFoundException
+from db_adapters import CountMode
+
+from .base import Base, NotFoundException, async_client
 from .manga import Manga
 from .progress import ProgressTracking
 
@@ -24,6 +28,15 @@ class Chapter(Base):
     length: int
     webtoon: bool = False
     upload_time: datetime = Field(default_factory=datetime.now)
+    # Names of the smaller versions available for the pages
+    renditions: List[str] = []
+    # Extension of the pages, it depends on the format they were saved in
+    extension: str = "jpg"
+    # Hashes of the content-addressed objects of the pages, empty if they're saved in the chapter's folder
+    pages: List[str] = []
+    # Each commit saves the pages in a new folder named after it, so they never change once saved (0 for the chapters
+    # saved before, their pages are right in the chapter's folder)
+    media_version: int = 0
 
     owner_id: Optional[UUID]
     manga_id: UUID
@@ -79,8 +92,47 @@ class Chapter(Base):
         return cls(**chapter.dict(exclude={"manga"}), manga=manga)
 
     @classmethod
-    async def latest(cls, db_session: Deta, limit: int = 20, offset: int = 0, user_id: Optional[UUID] = None):
-        count, page = await cls._pagination(db_session, {}, limit, offset, lambda x: x.upload_time, True)
+    async def next_media_version(cls, db_session: Deta, chapter: "Chapter") -> int:
+        """
+        Returns the media version the next commit of the chapter saves its pages in.
+        Deta can't lock the chapter, so each version is claimed by inserting its key (it conflicts if another commit
+        claimed it already), two commits never save their pages in the same folder.
+        """
+        version = chapter.media_version + 1
+        async with async_client(db_session, "chapter_media_versions") as db:
+            while True:
+                try:
+                    await db.insert({"chapter_id": str(chapter.id)}, f"{chapter.id}/v{version}")
+                    return version
+                except ClientResponseError as e:
+                    if e.status != status.HTTP_409_CONFLICT:
+                        raise
+                    version += 1
+
+    @classmethod
+    async def record_renditions(cls, db_session: Deta, id: UUID, media_version: int, renditions: List[str]):
+        """
+        Records the renditions generated for the pages of a media version, unless another commit replaced it since.
+        Only this field is updated, so the changes made to the chapter in the meantime are kept.
+        """
+        async with async_client(db_session, cls.db_name) as db:
+            chapter = await db.get(str(id))
+            if chapter and chapter["media_version"] == media_version:
+                await db.update({"renditions": renditions}, str(id))
+
+    @classmethod
+    async def latest(
+        cls,
+        db_session: Deta,
+        limit: int = 20,
+        offset: int = 0,
+        user_id: Optional[UUID] = None,
+        cursor: Optional[list] = None,
+        count: CountMode = CountMode.exact,
+    ):
+        total, page, next_cursor = await cls._pagination(
+            db_session, {}, limit, offset, lambda x: x.upload_time, True, cursor, count
+        )
 
         page = [chapter.dict() for chapter in page]
 
@@ -91,9 +143,9 @@ class Chapter(Base):
             chapter["manga"] = cache[chapter["manga_id"]]
 
         if user_id:
-            page = [await ProgressTracking.from_chapter(db_session, result, user_id) for result in page]
+            page = await ProgressTracking.from_chapters(db_session, page, user_id)
 
-        return count, page
+        return total, page, next_cursor
 
     @classmethod
     async def from_manga(cls, db_session: Deta, manga_id: UUID, user_id: Optional[UUID] = None):
@@ -102,7 +154,7 @@ class Chapter(Base):
         results = sorted(results, key=lambda x: x.number, reverse=True)
 
         if user_id:
-            results = [await ProgressTracking.from_chapter(db_session, result, user_id) for result in results]
+            results = await ProgressTracking.from_chapters(db_session, [result.dict() for result in results], user_id)
 
         return results
 
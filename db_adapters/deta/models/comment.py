@@ -6,6 +6,8 @@ from deta import Deta
 from fastapi_permissions import Allow, Authenticated, Everyone
 from pydantic import Field
 
+from db_adapters import CountMode
+
 from .base import Base
 from .user import User
 
@@ -38,9 +40,19 @@ class Comment(Base):
         )
 
     @classmethod
-    async def from_chapter(cls, db_session: Deta, chapter_id: UUID, limit: int = 20, offset: int = 0):
+    async def from_chapter(
+        cls,
+        db_session: Deta,
+        chapter_id: UUID,
+        limit: int = 20,
+        offset: int = 0,
+        cursor: Optional[list] = None,
+        count: CountMode = CountMode.exact,
+    ):
         query = {"chapter_id": str(chapter_id)}
-        count, page = await Comment._pagination(db_session, query, limit, offset, lambda x: x.create_time)
+        total, page, next_cursor = await Comment._pagination(
+            db_session, query, limit, offset, lambda x: x.create_time, cursor=cursor, count=count
+        )
 
         page = [comment.dict() for comment in page]
 
@@ -50,4 +62,4 @@ class Comment(Base):
                 cache[comment["author_id"]] = await User.find(db_session, comment["author_id"])
             comment["author"] = cache[comment["author_id"]]
 
-        return count, page
+        return total, page, next_cursor
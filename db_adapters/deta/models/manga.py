@@ -6,6 +6,8 @@ from uuid import UUID
 from deta import Deta
 from fastapi_permissions import Allow, Everyone
 
+from db_adapters import CountMode
+
 from .base import Base, Field
 
 
@@ -60,7 +62,15 @@ class Manga(Base):
         await super().delete(db_session)
 
     @classmethod
-    async def search(cls, db_session: Deta, title: str, limit: int = 20, offset: int = 0):
+    async def search(
+        cls,
+        db_session: Deta,
+        title: str,
+        limit: int = 20,
+        offset: int = 0,
+        cursor: Optional[list] = None,
+        count: CountMode = CountMode.exact,
+    ):
         """
         Returns a page of manga that fit the search query.
         """
@@ -68,4 +78,6 @@ class Manga(Base):
             query = {"title?contains": title}
         else:
             query = {}
-        return await cls._pagination(db_session, query, limit, offset, lambda x: x.create_time)
+        return await cls._pagination(
+            db_session, query, limit, offset, lambda x: x.create_time, cursor=cursor, count=count
+        )
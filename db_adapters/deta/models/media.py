@@ -0,0 +1,128 @@
+import uuid
+from collections import Counter
+from typing import ClassVar
+
+from aiohttp import ClientResponseError
+from deta import Deta
+from fastapi import status
+from fastapi.encoders import jsonable_encoder
+
+from .base import Base, async_client
+
+
+class MediaObject(Base):
+    # SHA-256 of the content of the object, its id is derived from it
+    hash: str
+    extension: str
+    # Amount of chapter pages that use this object
+    refcount: int = 0
+    # Set once the content has been saved in the media, until then each commit using the object saves it
+    # (the objects created before this field existed are stored)
+    stored: bool = True
+    # Names of the renditions saved next to the content, the commits reusing the object add the missing ones
+    renditions: list[str] = []
+
+    db_name: ClassVar = "media_objects"
+
+    @staticmethod
+    def id_of(digest: str):
+        return uuid.uuid5(uuid.NAMESPACE_OID, digest)
+
+    @classmethod
+    async def acquire(cls, db_session: Deta, hashes: list[str], extension: str):
+        """
+        Adds a reference to the objects of the provided hashes (one per occurrence), the missing ones are created.
+        The content of the created objects still needs to be saved in the media, see `mark_stored`.
+        """
+        async with async_client(db_session, cls.db_name) as db:
+            for digest, count in Counter(hashes).items():
+                instance = cls(
+                    id=cls.id_of(digest), version=1, hash=digest, extension=extension, refcount=count, stored=False
+                )
+                try:
+                    # Fails with a conflict if the object already exists
+                    await db.insert(jsonable_encoder(instance))
+                except ClientResponseError as e:
+                    if e.status != status.HTTP_409_CONFLICT:
+                        raise
+                    await db.update({"refcount": db.util.increment(count)}, str(instance.id))
+
+    @classmethod
+    async def from_hashes(cls, db_session: Deta, hashes: list[str]) -> list["MediaObject"]:
+        """
+        Returns the existing objects of the provided hashes, they're fetched at once (Deta ORs the queries).
+        """
+        if not hashes:
+            return []
+        return await cls._fetch(db_session, [{"key": str(cls.id_of(digest))} for digest in set(hashes)])
+
+    @classmethod
+    async def mark_stored(cls, db_session: Deta, hashes: list[str], renditions: list[str]):
+        """
+        Records that the content of the objects of the provided hashes is saved in the media, with the renditions.
+        The renditions are appended (another commit could have added other ones), duplicated names are harmless.
+        """
+        async with async_client(db_session, cls.db_name) as db:
+            for digest in set(hashes):
+                try:
+                    await db.update({"stored": True, "renditions": db.util.append(renditions)}, str(cls.id_of(digest)))
+                except ClientResponseError as e:
+                    # The object was released in the meantime
+                    if e.status != status.HTTP_404_NOT_FOUND:
+                        raise
+
+    @classmethod
+    async def release(cls, db_session: Deta, hashes: list[str]) -> list[str]:
+        """
+        Removes a reference to the objects of the provided hashes (one per occurrence).
+        Returns the hashes of the objects that aren't used anymore, they're kept until collected, see `lock_unused`.
+        """
+        released = []
+        async with async_client(db_session, cls.db_name) as db:
+            for digest, count in Counter(hashes).items():
+                key = str(cls.id_of(digest))
+                try:
+                    await db.update({"refcount": db.util.increment(-count)}, key)
+                except ClientResponseError as e:
+                    # The object was already collected
+                    if e.status != status.HTTP_404_NOT_FOUND:
+                        raise
+                    continue
+
+                instance = await db.get(key)
+                if instance and instance["refcount"] <= 0:
+                    released.append(digest)
+
+        return released
+
+    @classmethod
+    async def lock_unused(cls, db_session: Deta, hashes: list[str]) -> list[str]:
+        """
+        Returns the hashes of the provided objects that are still unused, their content can be deleted.
+        Deta can't lock them, they're marked as not stored instead: a commit acquiring them in the meantime saves
+        their content again.
+        """
+        unused = [instance for instance in await cls.from_hashes(db_session, hashes) if instance.refcount <= 0]
+        async with async_client(db_session, cls.db_name) as db:
+            for instance in list(unused):
+                try:
+                    await db.update({"stored": False}, str(instance.id))
+                except ClientResponseError as e:
+                    # Another collection deleted the object in the meantime
+                    if e.status != status.HTTP_404_NOT_FOUND:
+                        raise
+                    unused.remove(instance)
+
+        return [instance.hash for instance in unused]
+
+    @classmethod
+    async def delete_unused(cls, db_session: Deta, hashes: list[str]):
+        """
+        Deletes the objects returned by `lock_unused` once their content was deleted, unless they were acquired again.
+        """
+        async with async_client(db_session, cls.db_name) as db:
+            for digest in hashes:
+                key = str(cls.id_of(digest))
+                instance = await db.get(key)
+                if instance and instance["refcount"] <= 0:
+                    await db.delete(key)
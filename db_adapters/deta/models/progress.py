@@ -1,11 +1,10 @@
-from typing import ClassVar
+from typing import ClassVar, List
 from uuid import UUID
 
 from deta import Deta
 from fastapi_permissions import Allow, Authenticated
 
 from .base import Base
-from .chapter import Chapter
 
 
 class ProgressTracking(Base):
@@ -47,13 +46,21 @@ class ProgressTracking(Base):
         return result[0] if len(result) else None
 
     @classmethod
-    async def from_chapter(cls, db_session: Deta, chapter: Chapter, author_id: UUID):
+    async def from_chapters(cls, db_session: Deta, chapters: List[dict], author_id: UUID):
         """
-        Returns the tracking progress for the current user on that chapter.
+        Returns the chapters (as dicts) with the tracking progress for the current user on each of them.
+        The tracking of all the chapters is fetched at once, with a query for each of them (Deta ORs them).
         """
-        instance = await cls.get(db_session, chapter["id"], author_id)
+        if not chapters:
+            return []
 
-        return {
-            **chapter,
-            "tracking": [instance] if instance else [],
-        }
+        query = [{"chapter_id": str(chapter["id"]), "author_id": str(author_id)} for chapter in chapters]
+        tracking = {instance.chapter_id: instance for instance in await cls._fetch(db_session, query)}
+
+        return [
+            {
+                **chapter,
+                "tracking": [tracking[chapter["id"]]] if chapter["id"] in tracking else [],
+            }
+            for chapter in chapters
+        ]
@@ -1,14 +1,26 @@
+from datetime import datetime
+from enum import Enum
 from typing import ClassVar, List, Optional
 from uuid import UUID
 
 from deta import Deta
 from fastapi_permissions import Allow
+from pydantic import Field
 
 from .base import Base, NotFoundException
 
 
+class JobStatus(str, Enum):
+    pending = "pending"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+
 class UploadedBlob(Base):
     name: str
+    # SHA-256 of the saved blob
+    hash: Optional[str]
 
     session_id: UUID
 
@@ -22,6 +34,34 @@ class UploadedBlob(Base):
         return await UploadedBlob._fetch(db_session, {"session_id": str(session_id)})
 
 
+class SliceJob(Base):
+    status: JobStatus = JobStatus.pending
+    # Amount of pages already sliced, out of `total`
+    progress: int = 0
+    total: int
+    detail: Optional[str]
+    # Last change of the job, a pending or running job that isn't updated anymore was interrupted
+    update_time: datetime = Field(default_factory=datetime.now)
+
+    session_id: UUID
+
+    db_name: ClassVar = "slice_jobs"
+
+    async def save(self, db_session: Deta):
+        """
+        Overrides the default save method to update the update_time.
+        """
+        self.update_time = datetime.now()
+        await super().save(db_session)
+
+    @classmethod
+    async def from_session(cls, db_session: Deta, session_id: UUID):
+        """
+        Returns all the slice jobs from the provided upload session.
+        """
+        return await SliceJob._fetch(db_session, {"session_id": str(session_id)})
+
+
 class UploadSession(Base):
     owner_id: Optional[UUID]
 
@@ -51,10 +91,14 @@ class UploadSession(Base):
 
     async def delete(self, db_session: Deta):
         blobs = await UploadedBlob._fetch(db_session, {"session_id": str(self.id)})
+        jobs = await SliceJob._fetch(db_session, {"session_id": str(self.id)})
 
         for b in blobs:
             await b.delete(db_session)
 
+        for j in jobs:
+            await j.delete(db_session)
+
         await super().delete(db_session)
 
     @classmethod
@@ -7,6 +7,8 @@ from deta import Deta
 from fastapi_permissions import Allow, Everyone
 from pydantic import BaseModel, EmailStr, Field
 
+from db_adapters import CountMode
+
 from .base import Base
 
 
@@ -104,7 +106,14 @@ class User(Base):
 
     @classmethod
     async def search(
-        cls, db_session: Deta, name: str = "", filters: Union[BaseModel, None] = None, limit: int = 20, offset: int = 0
+        cls,
+        db_session: Deta,
+        name: str = "",
+        filters: Union[BaseModel, None] = None,
+        limit: int = 20,
+        offset: int = 0,
+        cursor: Optional[list] = None,
+        count: CountMode = CountMode.exact,
     ):
         if filters is not None:
             filters = {k: v for k, v in filters.dict().items() if v}
@@ -112,4 +121,6 @@ class User(Base):
             filters = {}
         if name:
             filters["username?contains"] = name
-        return await cls._pagination(db_session, filters, limit, offset, lambda x: getattr(x, "username"))
+        return await cls._pagination(
+            db_session, filters, limit, offset, lambda x: getattr(x, "username"), cursor=cursor, count=count
+        )
@@ -1,4 +1,4 @@
-from .models import upload
+from .models import manga, upload
 from .session import db_session, engine
 
 db_session = db_session
@@ -7,9 +7,11 @@ db_session = db_session
 async def startup():
     """
     Removes lingering Upload sessions.
+    Checks which manga search can be used.
     """
     async for session in db_session():
         await upload.UploadSession.flush(session)
+        await manga.Manga.setup_search(session)
 
 
 async def shutdown():
@@ -0,0 +1,26 @@
+"""add update_time to slice jobs
+
+Revision ID: 9e4f1b6d2a73
+Revises: c5e2b7a19d34
+Create Date: 2026-10-18 15:12:09.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "9e4f1b6d2a73"
+down_revision = "c5e2b7a19d34"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "slicejob", sa.Column("update_time", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False)
+    )
+
+
+def downgrade():
+    op.drop_column("slicejob", "update_time")
@@ -0,0 +1,26 @@
+"""add stored to media objects
+
+Revision ID: a83f5d0c4e17
+Revises: fd2bd0dca14e
+Create Date: 2026-10-18 10:12:31.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a83f5d0c4e17"
+down_revision = "fd2bd0dca14e"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The objects created before were saved by the commit that created them
+    op.add_column("mediaobject", sa.Column("stored", sa.Boolean(), server_default=sa.true(), nullable=False))
+    op.alter_column("mediaobject", "stored", server_default=None)
+
+
+def downgrade():
+    op.drop_column("mediaobject", "stored")
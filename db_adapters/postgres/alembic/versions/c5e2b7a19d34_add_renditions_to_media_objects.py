@@ -0,0 +1,28 @@
+"""add renditions to media objects
+
+Revision ID: c5e2b7a19d34
+Revises: a83f5d0c4e17
+Create Date: 2026-10-18 11:05:47.681253
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "c5e2b7a19d34"
+down_revision = "a83f5d0c4e17"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The renditions of the existing objects aren't known, the next commit reusing them generates them again
+    op.add_column(
+        "mediaobject", sa.Column("renditions", postgresql.ARRAY(sa.String()), server_default="{}", nullable=False)
+    )
+
+
+def downgrade():
+    op.drop_column("mediaobject", "renditions")
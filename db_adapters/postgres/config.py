@@ -1,6 +1,14 @@
+from enum import Enum
 from functools import lru_cache
 
-from pydantic import BaseSettings
+from pydantic import BaseSettings, Field
+
+
+class SearchMode(str, Enum):
+    # Fuzzy search over the title, author and artist with pg_trgm, ranked by relevance
+    trigram = "TRIGRAM"
+    # Case-insensitive substring of the title, without index
+    ilike = "ILIKE"
 
 
 class PostgresSettings(BaseSettings):
@@ -8,6 +16,11 @@ class PostgresSettings(BaseSettings):
     pg_user: str
     pg_pass: str
     pg_db: str
+    pg_search_mode: SearchMode = SearchMode.trigram
+    # Minimum word similarity between the query and the searched text, lower values find more typos
+    pg_search_threshold: float = Field(0.5, ge=0, le=1)
+    # Listings estimated to have fewer results than this are counted exactly, estimates are rough for small ones
+    pg_exact_count_threshold: int = Field(10000, ge=0)
 
     @property
     def url(self):
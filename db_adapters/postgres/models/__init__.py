@@ -1,8 +1,9 @@
-from . import base, chapter, comment, manga, progress, settings, upload, user
+from . import base, chapter, comment, manga, media, progress, settings, upload, user
 
 chapter.__package__
 comment.__package__
 manga.__package__
+media.__package__
 progress.__package__
 settings.__package__
 upload.__package__
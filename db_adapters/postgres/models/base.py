@@ -1,16 +1,54 @@
 import uuid
+from typing import Optional, Tuple
 
 from fastapi import HTTPException
-from sqlalchemy import Column, Integer, func, select
+from pydantic import ValidationError, parse_obj_as
+from sqlalchemy import Column, Integer, func, literal, select, tuple_
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.declarative import as_declarative, declared_attr
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import ClauseElement, Executable, UnaryExpression
+
+from db_adapters import CountMode
+
+from ..config import get_settings
+
+db_settings = get_settings()
 
 ErrorException = HTTPException(422, "Database error")
 
 NotFoundException = HTTPException(404, "Resource not found")
 
+InvalidCursorException = HTTPException(400, "Invalid cursor")
+
+
+class Explain(Executable, ClauseElement):
+    """
+    Plan of a statement, in JSON.
+    """
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kwargs):
+    return f"EXPLAIN (FORMAT JSON) {compiler.process(element.statement, **kwargs)}"
+
+
+def _sort_key(expression):
+    """
+    Splits an element of ORDER BY into the expression it sorts on and whether it's in descending order.
+    """
+    if isinstance(expression, UnaryExpression) and expression.modifier in (operators.asc_op, operators.desc_op):
+        return expression.element, expression.modifier is operators.desc_op
+    return expression, False
+
 
 @as_declarative()
 class Base:
@@ -42,6 +80,23 @@ class Base:
 
         return self
 
+    @classmethod
+    async def save_many(cls, db_session: AsyncSession, instances: list):
+        """
+        Saves all the provided instances on db, in a single commit.
+        The session comes from `db_session` on `session.py`
+        """
+        try:
+            for instance in instances:
+                instance.version = instance.version + 1 if instance.version else 1
+            db_session.add_all(instances)
+
+            await db_session.commit()
+        except SQLAlchemyError:
+            raise ErrorException
+
+        return instances
+
     async def delete(self, db_session: AsyncSession):
         """
         Deletes this instance, it'll error out if it can't be found in the database.
@@ -81,12 +136,76 @@ class Base:
             return instance
 
     @classmethod
-    async def _pagination(cls, db_session, stmt, limit, offset, order_by):
+    async def _count(cls, db_session, stmt, count: CountMode = CountMode.exact):
+        """
+        Returns the amount of rows of an existing query (`stmt`), or None if they aren't counted.
+        The estimate is the amount of rows the planner expects, the rows are counted when there are only a few.
+        """
+        if count == CountMode.none:
+            return None
+
+        if count == CountMode.estimated:
+            plan = await db_session.execute(Explain(stmt.with_only_columns(cls.id)))
+            estimate = plan.scalar()[0]["Plan"]["Plan Rows"]
+            if estimate >= db_settings.pg_exact_count_threshold:
+                return estimate
+
+        count_result = await db_session.execute(stmt.with_only_columns(func.count(cls.id)))
+        return count_result.scalar()
+
+    @classmethod
+    async def _pagination(
+        cls,
+        db_session,
+        stmt,
+        limit,
+        offset,
+        order_by,
+        cursor: Optional[list] = None,
+        count: CountMode = CountMode.exact,
+        count_with_rows: bool = False,
+    ):
         """
-        Returns a paginated version of an existing query (`stmt`) in the order requested.
+        Returns a paginated version of an existing query (`stmt`) in the order requested, the ids break the ties.
+        The page starts after the row of the `cursor` instead of skipping `offset` rows when it's provided, so the
+        database doesn't read the previous pages and new rows don't shift the results.
+        The total (see `_count`) and the cursor of the next page are returned with the page, the cursor is None on the
+        last one.
+        `count_with_rows` counts the rows in the query of the page (with a window function) instead of a second one,
+        it's only worth it for the queries that have few rows since it has to read all of them instead of the page.
         """
-        count_stmt = stmt.with_only_columns(func.count(cls.id))
-        count_result = await db_session.execute(count_stmt)
-        page_stmt = stmt.order_by(*order_by).offset(offset).limit(limit)
-        page_result = await db_session.execute(page_stmt)
-        return count_result.scalars().first(), page_result.unique().scalars().all()
+        keys, descending = zip(*map(_sort_key, order_by))
+        if len(set(descending)) > 1:
+            raise ValueError("The rows can only be paginated in a single direction")
+        keys, descending = (*keys, cls.id), descending[0]
+
+        # The values of the keys are selected with each row, the cursor of the next page comes from the last one
+        page_stmt = stmt.add_columns(*keys).order_by(*(k.desc() if descending else k.asc() for k in keys))
+        if cursor is None:
+            page_stmt = page_stmt.offset(offset)
+        else:
+            try:
+                values = parse_obj_as(Tuple[tuple(k.type.python_type for k in keys)], cursor)
+            except ValidationError:
+                raise InvalidCursorException
+            row, last = tuple_(*keys), tuple_(*(literal(v, k.type) for k, v in zip(keys, values)))
+            page_stmt = page_stmt.where(row < last if descending else row > last)
+
+        # The cursor filters the rows out of the window, they're counted separately then
+        count_with_rows = count_with_rows and count != CountMode.none and cursor is None
+        if count_with_rows:
+            page_stmt = page_stmt.add_columns(func.count().over())
+
+        page_result = await db_session.execute(page_stmt.limit(limit + 1))
+        rows = page_result.unique().all()
+        next_cursor = list(rows[limit - 1][1 : len(keys) + 1]) if len(rows) > limit else None
+
+        if not count_with_rows:
+            total = await cls._count(db_session, stmt, count)
+        elif rows or not offset:
+            total = rows[0][-1] if rows else 0
+        else:
+            # Nothing to count the rows with past the last page
+            total = await cls._count(db_session, stmt, CountMode.exact)
+
+        return total, [row[0] for row in rows[:limit]], next_cursor
@@ -1,23 +1,41 @@
 import uuid
+from typing import Optional
 
 from fastapi_permissions import Allow, Everyone
-from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, String, func, or_, select
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, String, and_, func, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload, relationship
+from sqlalchemy.orm import contains_eager, joinedload, relationship
 
-from .base import Base, NotFoundException
+from db_adapters import CountMode
+
+from .base import Base, ErrorException, NotFoundException
 from .progress import ProgressTracking
 
 
 class Chapter(Base):
+    __table_args__ = (
+        # Chapters of a manga, already in the order they're listed in
+        Index("ix_chapter_manga_id_number", "manga_id", "number"),
+    )
+
     name = Column(String, nullable=False)
-    scan_group = Column(String, nullable=False)
+    scan_group = Column(String, nullable=False, index=True)
     volume = Column(Integer, nullable=True)
     number = Column(Float, nullable=False)
     length = Column(Integer, nullable=False)
     webtoon = Column(Boolean, default=False, nullable=False)
-    upload_time = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    upload_time = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    # Names of the smaller versions available for the pages
+    renditions = Column(ARRAY(String), default=list, server_default="{}", nullable=False)
+    # Extension of the pages, it depends on the format they were saved in
+    extension = Column(String, default="jpg", server_default="jpg", nullable=False)
+    # Hashes of the content-addressed objects of the pages, empty if they're saved in the chapter's folder
+    pages = Column(ARRAY(String), default=list, server_default="{}", nullable=False)
+    # Each commit saves the pages in a new folder named after it, so they never change once saved (0 for the chapters
+    # saved before, their pages are right in the chapter's folder)
+    media_version = Column(Integer, default=0, server_default="0", nullable=False)
 
     owner_id = Column(UUID(as_uuid=True), ForeignKey("user.id", name="fk_chapter_owner", ondelete="SET NULL"))
     manga_id = Column(UUID(as_uuid=True), ForeignKey("manga.id", ondelete="CASCADE"), nullable=False)
@@ -59,20 +77,61 @@ class Chapter(Base):
             return instance
 
     @classmethod
-    async def latest(cls, db_session: AsyncSession, limit: int = 20, offset: int = 0, user_id: uuid.UUID = None):
+    async def next_media_version(cls, db_session: AsyncSession, chapter: "Chapter") -> int:
+        """
+        Returns the media version the next commit of the chapter saves its pages in.
+        The chapter is locked and reloaded until the transaction ends, so the commits of the same chapter are done one
+        after the other, and each of them sees the pages saved by the previous one.
+        """
+        stmt = select(cls).where(cls.id == chapter.id).with_for_update().execution_options(populate_existing=True)
+        try:
+            await db_session.execute(stmt)
+        except SQLAlchemyError:
+            raise ErrorException
+        return chapter.media_version + 1
+
+    @classmethod
+    async def record_renditions(
+        cls, db_session: AsyncSession, id: uuid.UUID, media_version: int, renditions: list[str]
+    ):
+        """
+        Records the renditions generated for the pages of a media version, unless another commit replaced it since.
+        """
+        stmt = update(cls).where(cls.id == id, cls.media_version == media_version).values(renditions=renditions)
+        try:
+            await db_session.execute(stmt)
+            await db_session.commit()
+        except SQLAlchemyError:
+            raise ErrorException
+
+    @classmethod
+    def _with_tracking(cls, stmt, user_id: uuid.UUID):
+        """
+        Loads the tracking of the user in the same query as the chapters.
+        The user is part of the join condition, so the chapters they didn't read are kept with an empty tracking.
+        """
+        tracking = and_(ProgressTracking.chapter_id == cls.id, ProgressTracking.author_id == user_id)
+        return stmt.outerjoin(ProgressTracking, tracking).options(contains_eager(cls.tracking))
+
+    @classmethod
+    async def latest(
+        cls,
+        db_session: AsyncSession,
+        limit: int = 20,
+        offset: int = 0,
+        user_id: uuid.UUID = None,
+        cursor: Optional[list] = None,
+        count: CountMode = CountMode.exact,
+    ):
         """
         Returns a page of the latest chapters uploaded, they also include the details of their related manga.
         """
         stmt = select(cls).outerjoin(cls.manga).options(joinedload(cls.manga))
 
         if user_id:
-            stmt = (
-                stmt.outerjoin(cls.tracking)
-                .options(joinedload(cls.tracking))
-                .where(or_(cls.tracking == None, ProgressTracking.author_id == user_id))
-            )
+            stmt = cls._with_tracking(stmt, user_id)
 
-        return await cls._pagination(db_session, stmt, limit, offset, (cls.upload_time.desc(),))
+        return await cls._pagination(db_session, stmt, limit, offset, (cls.upload_time.desc(),), cursor, count)
 
     @classmethod
     async def from_manga(cls, db_session: AsyncSession, manga_id: uuid.UUID, user_id: uuid.UUID = None):
@@ -82,9 +141,7 @@ class Chapter(Base):
         stmt = select(cls).where(cls.manga_id == manga_id).order_by(cls.number.desc())
 
         if user_id:
-            stmt = stmt.options(joinedload(cls.tracking)).where(
-                or_(cls.tracking == None, ProgressTracking.author_id == user_id)
-            )
+            stmt = cls._with_tracking(stmt, user_id)
 
         result = await db_session.execute(stmt)
         return result.unique().scalars().all()
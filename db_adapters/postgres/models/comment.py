@@ -1,15 +1,23 @@
 import uuid
+from typing import Optional
 
 from fastapi_permissions import Allow, Authenticated, Everyone
-from sqlalchemy import Column, DateTime, ForeignKey, String, func, select
+from sqlalchemy import Column, DateTime, ForeignKey, Index, String, func, select
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload, relationship
 
+from db_adapters import CountMode
+
 from .base import Base
 
 
 class Comment(Base):
+    __table_args__ = (
+        # Comments of a chapter, already in the order they're listed in
+        Index("ix_comment_chapter_id_create_time", "chapter_id", "create_time"),
+    )
+
     content = Column(String, nullable=False)
     reply_to = Column(UUID(as_uuid=True))
     create_time = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -42,9 +50,14 @@ class Comment(Base):
         chapter_id: uuid.UUID,
         limit: int = 20,
         offset: int = 0,
+        cursor: Optional[list] = None,
+        count: CountMode = CountMode.exact,
     ):
         """
         Returns a page of comments from the provided chapter.
         """
         stmt = select(cls).where(cls.chapter_id == chapter_id).options(joinedload(cls.author))
-        return await cls._pagination(db_session, stmt, limit, offset, (cls.create_time.desc(),))
+        # A chapter has few comments, they're counted in the same query
+        return await cls._pagination(
+            db_session, stmt, limit, offset, (cls.create_time.desc(),), cursor, count, count_with_rows=True
+        )
@@ -1,13 +1,35 @@
 import enum
+import logging
+from typing import Optional
 
 from fastapi_permissions import Allow, Everyone
-from sqlalchemy import Column, DateTime, Enum, ForeignKey, Numeric, String, func, select
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Enum,
+    Float,
+    ForeignKey,
+    Index,
+    Numeric,
+    String,
+    func,
+    literal_column,
+    or_,
+    select,
+    text,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import relationship
 
+from db_adapters import CountMode
+
+from ..config import SearchMode, get_settings
 from .base import Base
 
+db_settings = get_settings()
+logger = logging.getLogger(__name__)
+
 
 class Status(str, enum.Enum):
     ongoing = "ongoing"
@@ -17,6 +39,17 @@ class Status(str, enum.Enum):
 
 
 class Manga(Base):
+    __table_args__ = (
+        # Trigrams of the searched text, they find both its substrings and the words similar to the query
+        Index(
+            "ix_manga_search_trgm",
+            text("(title || ' ' || author || ' ' || artist) gin_trgm_ops"),
+            postgresql_using="gin",
+        ),
+        # Manga listing, the ids break the ties of the cursors
+        Index("ix_manga_create_time_id", "create_time", "id"),
+    )
+
     owner_id = Column(UUID(as_uuid=True), ForeignKey("user.id", name="fk_manga_owner", ondelete="SET NULL"))
     title = Column(String, nullable=False)
     description = Column(String, nullable=False)
@@ -30,6 +63,9 @@ class Manga(Base):
     chapters = relationship("Chapter", back_populates="manga", cascade="all, delete", passive_deletes=True)
     sessions = relationship("UploadSession", back_populates="manga", cascade="all, delete", passive_deletes=True)
 
+    # Set on startup, the trigram search needs the pg_trgm extension
+    trigram_search = False
+
     @property
     def __acl__(self):
         return (
@@ -47,10 +83,55 @@ class Manga(Base):
         )
 
     @classmethod
-    async def search(cls, db_session: AsyncSession, title: str, limit: int = 20, offset: int = 0):
+    async def setup_search(cls, db_session: AsyncSession):
+        """
+        Enables the trigram search if it's configured and pg_trgm is installed, the ILIKE search is used otherwise.
+        """
+        if db_settings.pg_search_mode != SearchMode.trigram:
+            return
+
+        result = await db_session.execute(text("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')"))
+        cls.trigram_search = result.scalar()
+        if not cls.trigram_search:
+            logger.warning("The pg_trgm extension isn't installed, the manga search falls back to ILIKE")
+
+    @classmethod
+    def search_text(cls):
+        # Same expression as the trigram index, so the searches can use it
+        return cls.title + literal_column("' '") + cls.author + literal_column("' '") + cls.artist
+
+    @classmethod
+    async def search(
+        cls,
+        db_session: AsyncSession,
+        title: str,
+        limit: int = 20,
+        offset: int = 0,
+        cursor: Optional[list] = None,
+        count: CountMode = CountMode.exact,
+    ):
         """
         Returns a page of manga that fit the search query.
+        The trigram search also looks in the author and artist, and matches the words similar to the query.
+        Its results are ranked by relevance: the titles containing the query, then the most similar titles and texts.
         """
-        escaped_title = title.replace("%", "\\%")
-        stmt = select(cls).where(cls.title.ilike(f"%{escaped_title}%"))
-        return await cls._pagination(db_session, stmt, limit, offset, (cls.create_time.desc(),))
+        if not title or not cls.trigram_search:
+            escaped_title = title.replace("%", "\\%")
+            stmt = select(cls).where(cls.title.ilike(f"%{escaped_title}%"))
+            return await cls._pagination(db_session, stmt, limit, offset, (cls.create_time.desc(),), cursor, count)
+
+        # `%>` is true when the text has words similar enough to the query, the threshold only lasts for the transaction
+        threshold = str(db_settings.pg_search_threshold)
+        await db_session.execute(select(func.set_config("pg_trgm.word_similarity_threshold", threshold, True)))
+
+        search_text = cls.search_text()
+        escaped_title = title.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        pattern = f"%{escaped_title}%"
+        stmt = select(cls).where(or_(search_text.ilike(pattern), search_text.op("%>")(title)))
+        order_by = (
+            cls.title.ilike(pattern).desc(),
+            func.word_similarity(title, cls.title, type_=Float).desc(),
+            func.word_similarity(title, search_text, type_=Float).desc(),
+            cls.create_time.desc(),
+        )
+        return await cls._pagination(db_session, stmt, limit, offset, order_by, cursor, count)
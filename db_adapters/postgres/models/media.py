@@ -0,0 +1,147 @@
+import uuid
+from collections import Counter
+
+from sqlalchemy import Boolean, Column, Integer, String, delete, func, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base import Base, ErrorException
+
+
+class MediaObject(Base):
+    # SHA-256 of the content of the object, its id is derived from it
+    hash = Column(String, nullable=False)
+    extension = Column(String, nullable=False)
+    # Amount of chapter pages that use this object
+    refcount = Column(Integer, nullable=False, default=0)
+    # Set once the content has been saved in the media, until then each commit using the object saves it
+    stored = Column(Boolean, nullable=False, default=False)
+    # Names of the renditions saved next to the content, the commits reusing the object add the missing ones
+    renditions = Column(ARRAY(String), default=list, server_default="{}", nullable=False)
+
+    @staticmethod
+    def id_of(digest: str):
+        return uuid.uuid5(uuid.NAMESPACE_OID, digest)
+
+    @classmethod
+    async def acquire(cls, db_session: AsyncSession, hashes: list[str], extension: str):
+        """
+        Adds a reference to the objects of the provided hashes (one per occurrence), the missing ones are created.
+        The content of the created objects still needs to be saved in the media, see `mark_stored`.
+        """
+        counts = Counter(hashes)
+        if not counts:
+            return
+
+        stmt = insert(cls).values(
+            [
+                {"id": cls.id_of(digest), "version": 1, "hash": digest, "extension": extension, "refcount": count}
+                for digest, count in counts.items()
+            ]
+        )
+        # A released object that wasn't collected yet is used again, its content is still stored
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[cls.id], set_={"refcount": func.greatest(cls.refcount, 0) + stmt.excluded.refcount}
+        )
+
+        try:
+            await db_session.execute(stmt)
+            await db_session.commit()
+        except SQLAlchemyError:
+            raise ErrorException
+
+    @classmethod
+    async def from_hashes(cls, db_session: AsyncSession, hashes: list[str]) -> list["MediaObject"]:
+        """
+        Returns the existing objects of the provided hashes.
+        """
+        stmt = select(cls).where(cls.id.in_([cls.id_of(digest) for digest in set(hashes)]))
+        result = await db_session.execute(stmt)
+        return result.scalars().all()
+
+    @classmethod
+    async def mark_stored(cls, db_session: AsyncSession, hashes: list[str], renditions: list[str]):
+        """
+        Records that the content of the objects of the provided hashes is saved in the media, with the renditions.
+        """
+        if not hashes:
+            return
+
+        # Union of the renditions, another commit could have added other ones in the meantime
+        saved_renditions = func.array(
+            select(func.unnest(cls.renditions.concat(renditions))).distinct().scalar_subquery()
+        )
+        try:
+            stmt = (
+                update(cls)
+                .where(cls.id.in_([cls.id_of(digest) for digest in set(hashes)]))
+                .values(stored=True, renditions=saved_renditions)
+            )
+            await db_session.execute(stmt)
+            await db_session.commit()
+        except SQLAlchemyError:
+            raise ErrorException
+
+    @classmethod
+    async def release(cls, db_session: AsyncSession, hashes: list[str]) -> list[str]:
+        """
+        Removes a reference to the objects of the provided hashes (one per occurrence).
+        Returns the hashes of the objects that aren't used anymore, they're kept until collected, see `lock_unused`.
+        """
+        counts = Counter(hashes)
+        if not counts:
+            return []
+
+        released = []
+        try:
+            for digest, count in counts.items():
+                stmt = (
+                    update(cls)
+                    .where(cls.id == cls.id_of(digest))
+                    .values(refcount=cls.refcount - count)
+                    .returning(cls.refcount)
+                )
+                refcount = (await db_session.execute(stmt)).scalar()
+                if refcount is not None and refcount <= 0:
+                    released.append(digest)
+            await db_session.commit()
+        except SQLAlchemyError:
+            raise ErrorException
+
+        return released
+
+    @classmethod
+    async def lock_unused(cls, db_session: AsyncSession, hashes: list[str]) -> list[str]:
+        """
+        Returns the hashes of the provided objects that are still unused, their content can be deleted.
+        They're locked until `delete_unused` commits, a commit acquiring them in the meantime waits for it and
+        creates them again.
+        """
+        if not hashes:
+            return []
+
+        stmt = (
+            select(cls.hash)
+            .where(cls.id.in_([cls.id_of(digest) for digest in set(hashes)]), cls.refcount <= 0)
+            .with_for_update()
+        )
+        try:
+            result = await db_session.execute(stmt)
+        except SQLAlchemyError:
+            raise ErrorException
+
+        return result.scalars().all()
+
+    @classmethod
+    async def delete_unused(cls, db_session: AsyncSession, hashes: list[str]):
+        """
+        Deletes the objects locked by `lock_unused`, once their content was deleted.
+        """
+        try:
+            if hashes:
+                stmt = delete(cls).where(cls.id.in_([cls.id_of(digest) for digest in hashes]), cls.refcount <= 0)
+                await db_session.execute(stmt)
+            await db_session.commit()
+        except SQLAlchemyError:
+            raise ErrorException
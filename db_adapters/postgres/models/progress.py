@@ -1,7 +1,7 @@
 import uuid
 
 from fastapi_permissions import Allow, Authenticated
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, and_, select
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, and_, select
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -9,6 +9,11 @@ from .base import Base
 
 
 class ProgressTracking(Base):
+    __table_args__ = (
+        # A user only has one tracking per chapter
+        Index("ix_progresstracking_author_id_chapter_id", "author_id", "chapter_id", unique=True),
+    )
+
     # Page allows us to return to the latest page read
     # TODO: decide if this should be synced to server or just sync the others, or make it opt-in
     page = Column(Integer, default=0, nullable=False)
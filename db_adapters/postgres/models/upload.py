@@ -1,7 +1,9 @@
+import enum
 import uuid
+from datetime import datetime, timezone
 
 from fastapi_permissions import Allow
-from sqlalchemy import Column, ForeignKey, String, delete, select
+from sqlalchemy import Column, DateTime, Enum, ForeignKey, Integer, String, delete, func, select
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload, relationship
@@ -9,6 +11,13 @@ from sqlalchemy.orm import joinedload, relationship
 from .base import Base, NotFoundException
 
 
+class JobStatus(str, enum.Enum):
+    pending = "pending"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+
 class UploadSession(Base):
     owner_id = Column(UUID(as_uuid=True), ForeignKey("user.id", name="fk_session_owner", ondelete="CASCADE"))
 
@@ -17,8 +26,9 @@ class UploadSession(Base):
     chapter_id = Column(UUID(as_uuid=True), ForeignKey("chapter.id", ondelete="CASCADE"))
     chapter = relationship("Chapter", back_populates="sessions")
 
-    # Related blobs are deleted with the session
+    # Related blobs and jobs are deleted with the session
     blobs = relationship("UploadedBlob", back_populates="session", cascade="all, delete", passive_deletes=True)
+    jobs = relationship("SliceJob", back_populates="session", cascade="all, delete", passive_deletes=True)
 
     @property
     def __acl__(self):
@@ -65,8 +75,12 @@ class UploadSession(Base):
 
 class UploadedBlob(Base):
     name = Column(String, nullable=False)
+    # SHA-256 of the saved blob
+    hash = Column(String, nullable=True)
 
-    session_id = Column(UUID(as_uuid=True), ForeignKey("uploadsession.id", ondelete="CASCADE"), nullable=False)
+    session_id = Column(
+        UUID(as_uuid=True), ForeignKey("uploadsession.id", ondelete="CASCADE"), nullable=False, index=True
+    )
     session = relationship("UploadSession", back_populates="blobs")
 
     @classmethod
@@ -78,3 +92,33 @@ class UploadedBlob(Base):
         result = await db_session.execute(stmt)
 
         return result.scalars().all()
+
+
+class SliceJob(Base):
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.pending)
+    # Amount of pages already sliced, out of `total`
+    progress = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=False)
+    detail = Column(String, nullable=True)
+    # Last change of the job, a pending or running job that isn't updated anymore was interrupted
+    update_time = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    session_id = Column(UUID(as_uuid=True), ForeignKey("uploadsession.id", ondelete="CASCADE"), nullable=False)
+    session = relationship("UploadSession", back_populates="jobs")
+
+    async def save(self, db_session: AsyncSession):
+        """
+        Overrides the default save method to update the update_time.
+        """
+        self.update_time = datetime.now(timezone.utc)
+        await super().save(db_session)
+
+    @classmethod
+    async def from_session(cls, db_session: AsyncSession, session_id: uuid.UUID):
+        """
+        Returns all the slice jobs from the provided upload session.
+        """
+        stmt = select(cls).where(cls.session_id == session_id)
+        result = await db_session.execute(stmt)
+
+        return result.scalars().all()
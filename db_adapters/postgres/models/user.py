@@ -9,6 +9,8 @@ from sqlalchemy import Column, DateTime, Enum, String, and_, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import relationship
 
+from db_adapters import CountMode
+
 from .base import Base
 
 
@@ -21,7 +23,7 @@ class Role(str, enum.Enum):
 class User(Base):
     role = Column(Enum(Role), nullable=False, default=Role.user)
     username = Column(String(15), nullable=False, unique=True)
-    email = Column(String, nullable=True)
+    email = Column(String, nullable=True, index=True)
     hashed_password = Column(String, nullable=False)
     update_time = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
@@ -98,6 +100,8 @@ class User(Base):
         filters: Union[BaseModel, None] = None,
         limit: int = 20,
         offset: int = 0,
+        cursor: Optional[list] = None,
+        count: CountMode = CountMode.exact,
     ):
         """
         Returns a page of users fitting the criteria.
@@ -106,4 +110,4 @@ class User(Base):
         if filters is not None:
             filters = {k: v for k, v in filters.dict().items() if v}
             stmt = stmt.where(and_(True, *[getattr(cls, k) == v for k, v in filters.items()]))
-        return await cls._pagination(db_session, stmt, limit, offset, (cls.username,))
+        return await cls._pagination(db_session, stmt, limit, offset, (cls.username,), cursor, count)
@@ -0,0 +1,264 @@
+import argparse
+import asyncio
+import statistics
+from os import getenv
+from time import perf_counter
+
+import asyncpg
+
+# Indexes added by the "add lookup indexes" revision, dropped (in a transaction) to measure the queries without them
+LOOKUP_INDEXES = (
+    "ix_chapter_manga_id_number",
+    "ix_chapter_scan_group",
+    "ix_chapter_upload_time",
+    "ix_comment_chapter_id_create_time",
+    "ix_progresstracking_author_id_chapter_id",
+    "ix_uploadedblob_session_id",
+    "ix_user_email",
+)
+
+# Same queries as the models, with a function picking the parameters of each run
+QUERIES = {
+    "Chapter.from_manga": (
+        "SELECT * FROM chapter WHERE manga_id = $1 ORDER BY number DESC",
+        lambda s: (s.pick("manga"),),
+    ),
+    "Chapter.latest": (
+        "SELECT * FROM chapter LEFT JOIN manga ON manga.id = chapter.manga_id "
+        "ORDER BY chapter.upload_time DESC LIMIT 20 OFFSET $1",
+        lambda s: (s.pick("offset"),),
+    ),
+    "Comment.from_chapter": (
+        "SELECT * FROM comment WHERE chapter_id = $1 ORDER BY create_time DESC LIMIT 20",
+        lambda s: (s.pick("chapter"),),
+    ),
+    "ProgressTracking.get": (
+        "SELECT * FROM progresstracking WHERE chapter_id = $1 AND author_id = $2",
+        lambda s: s.pick("tracking"),
+    ),
+    "UploadedBlob.from_session": (
+        "SELECT * FROM uploadedblob WHERE session_id = $1",
+        lambda s: (s.pick("session"),),
+    ),
+    "User.from_email": (
+        'SELECT * FROM "user" WHERE email = $1',
+        lambda s: (s.pick("email"),),
+    ),
+    "Chapter.get_groups": (
+        "SELECT DISTINCT scan_group FROM chapter",
+        lambda s: (),
+    ),
+}
+
+
+class Samples:
+    """
+    Existing values the queries are run with, a different one each time.
+    """
+
+    def __init__(self, values: dict):
+        self.values = values
+        self.counters = {name: 0 for name in values}
+
+    @classmethod
+    async def load(cls, conn):
+        async def column(query: str):
+            return [tuple(r) if len(r) > 1 else r[0] for r in await conn.fetch(query)]
+
+        return cls(
+            {
+                "manga": await column("SELECT id FROM manga ORDER BY random() LIMIT 200"),
+                "chapter": await column("SELECT id FROM chapter ORDER BY random() LIMIT 200"),
+                "tracking": await column(
+                    "SELECT chapter_id, author_id FROM progresstracking ORDER BY random() LIMIT 200"
+                ),
+                "session": await column("SELECT id FROM uploadsession ORDER BY random() LIMIT 200"),
+                "email": await column('SELECT email FROM "user" WHERE email IS NOT NULL ORDER BY random() LIMIT 200'),
+                "offset": [0, 20, 100, 1000],
+            }
+        )
+
+    def pick(self, name: str):
+        values = self.values[name]
+        self.counters[name] += 1
+        return values[self.counters[name] % len(values)]
+
+
+async def seed(conn, args):
+    """
+    Fills the database with a synthetic catalog, the schema needs to be up to date (alembic upgrade head).
+    """
+    print(
+        f"Seeding {args.users} users, {args.mangas} mangas with {args.chapters} chapters, {args.comments} comments per"
+        f" chapter, {args.tracking} tracked chapters per user and {args.sessions} upload sessions..."
+    )
+    start = perf_counter()
+
+    async with conn.transaction():
+        await conn.execute(
+            """
+            INSERT INTO "user" (id, version, username, email, hashed_password, role)
+            SELECT md5(random()::text || i)::uuid, 1, 'b' || i || '_' || left(md5(random()::text), 6),
+                   'bench' || i || '@example.com', 'x', 'user'
+            FROM generate_series(1, $1) i
+            """,
+            args.users,
+        )
+        await conn.execute(
+            """
+            INSERT INTO manga (id, version, title, description, author, artist, status, create_time)
+            SELECT md5(random()::text || i)::uuid, 1, 'Manga ' || i, 'Benchmark manga', 'Author', 'Artist', 'ongoing',
+                   now() - random() * interval '3650 days'
+            FROM generate_series(1, $1) i
+            """,
+            args.mangas,
+        )
+        await conn.execute(
+            """
+            INSERT INTO chapter (id, version, name, scan_group, number, length, webtoon, upload_time, manga_id)
+            SELECT md5(random()::text || m.id || i)::uuid, 1, 'Chapter ' || i, 'Group ' || (random() * 200)::int, i,
+                   20, false, now() - random() * interval '3650 days', m.id
+            FROM manga m CROSS JOIN generate_series(1, $1) i
+            """,
+            args.chapters,
+        )
+
+        # Numbered copies of the ids, so each row can pick distinct ones without sorting randomly
+        await conn.execute('CREATE TEMP TABLE bench_user AS SELECT id, row_number() OVER () - 1 AS n FROM "user"')
+        await conn.execute("CREATE TEMP TABLE bench_chapter AS SELECT id, row_number() OVER () - 1 AS n FROM chapter")
+        await conn.execute("CREATE INDEX ON bench_user (n)")
+        await conn.execute("CREATE INDEX ON bench_chapter (n)")
+        users = await conn.fetchval("SELECT count(*) FROM bench_user")
+        chapters = await conn.fetchval("SELECT count(*) FROM bench_chapter")
+
+        await conn.execute(
+            """
+            INSERT INTO comment (id, version, content, create_time, chapter_id, author_id)
+            SELECT md5(random()::text || c.id || i)::uuid, 1, 'Comment ' || i, now() - random() * interval '3650 days',
+                   c.id, u.id
+            FROM bench_chapter c CROSS JOIN generate_series(1, $1) i
+            JOIN bench_user u ON u.n = (c.n * 31 + i) % $2::int
+            """,
+            args.comments,
+            users,
+        )
+        await conn.execute(
+            """
+            INSERT INTO progresstracking (id, version, page, read, chapter_version, chapter_id, author_id)
+            SELECT md5(random()::text || u.id || i)::uuid, 1, 0, true, 1, c.id, u.id
+            FROM bench_user u CROSS JOIN generate_series(0, LEAST($1::int, $2::int) - 1) i
+            JOIN bench_chapter c ON c.n = (u.n * 7919 + i) % $2::int
+            ON CONFLICT DO NOTHING
+            """,
+            args.tracking,
+            chapters,
+        )
+        await conn.execute(
+            """
+            INSERT INTO uploadsession (id, version, manga_id, owner_id)
+            SELECT md5(random()::text || i)::uuid, 1, (SELECT id FROM manga LIMIT 1), NULL
+            FROM generate_series(1, $1) i
+            """,
+            args.sessions,
+        )
+        await conn.execute(
+            """
+            INSERT INTO uploadedblob (id, version, name, session_id)
+            SELECT md5(random()::text || s.id || i)::uuid, 1, i || '.jpg', s.id
+            FROM uploadsession s CROSS JOIN generate_series(1, $1) i
+            """,
+            args.blobs,
+        )
+
+    await conn.execute("ANALYZE")
+    print(f"Seeded in {perf_counter() - start:.1f}s\n")
+
+
+async def measure(conn, samples: Samples, runs: int):
+    """
+    Returns the plan of each query, with the median and 95th percentile of its latency in milliseconds.
+    """
+    results = {}
+    for name, (query, params) in QUERIES.items():
+        plan = await conn.fetch(f"EXPLAIN (ANALYZE, BUFFERS) {query}", *params(samples))
+        statement = await conn.prepare(query)
+
+        latencies = []
+        for _ in range(runs):
+            args = params(samples)
+            start = perf_counter()
+            await statement.fetch(*args)
+            latencies.append((perf_counter() - start) * 1000)
+
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        results[name] = ([r[0] for r in plan], statistics.median(latencies), p95)
+    return results
+
+
+def report(title: str, results: dict, verbose: bool):
+    print(f"### {title}\n")
+    for name, (plan, median, p95) in results.items():
+        # The node reading the table tells if an index is used
+        scan = next((line for line in plan if "Scan" in line), plan[0]).split("  (")[0].strip(" ->")
+        print(f"{name:<28} median {median:8.3f} ms   p95 {p95:8.3f} ms   {scan}")
+        if verbose:
+            print("\n".join(f"    {line}" for line in plan) + "\n")
+    print()
+
+
+async def main(args):
+    """
+    Benchmarks the hot queries against the `PG_*` database, with and without the lookup indexes.
+    Only use it with a database meant for it, `--seed` inserts a lot of rows.
+    """
+    HOST = getenv("PG_HOST")
+    USER = getenv("PG_USER")
+    PASS = getenv("PG_PASS")
+    DB = getenv("PG_DB")
+
+    conn = await asyncpg.connect(f"postgresql://{USER}:{PASS}@{HOST}/{DB}")
+    try:
+        if args.seed:
+            await seed(conn, args)
+
+        samples = await Samples.load(conn)
+        if not all(samples.values.values()):
+            raise SystemExit("The database is missing some data, use --seed to fill it")
+
+        # DDL is transactional in Postgres, the indexes come back with the rollback
+        transaction = conn.transaction()
+        await transaction.start()
+        try:
+            for index in LOOKUP_INDEXES:
+                await conn.execute(f"DROP INDEX IF EXISTS {index}")
+            before = await measure(conn, samples, args.runs)
+        finally:
+            await transaction.rollback()
+
+        after = await measure(conn, samples, args.runs)
+    finally:
+        await conn.close()
+
+    report("Without the lookup indexes", before, args.verbose)
+    report("With the lookup indexes", after, args.verbose)
+
+    print("### Speedup (median)\n")
+    for name in QUERIES:
+        print(f"{name:<28} x{before[name][1] / after[name][1]:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the hot queries of the Postgres database")
+    parser.add_argument("--seed", action="store_true", help="fill the database with a synthetic catalog first")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--mangas", type=int, default=1000)
+    parser.add_argument("--chapters", type=int, default=50, help="per manga")
+    parser.add_argument("--comments", type=int, default=5, help="per chapter")
+    parser.add_argument("--tracking", type=int, default=50, help="tracked chapters per user")
+    parser.add_argument("--sessions", type=int, default=2000, help="upload sessions")
+    parser.add_argument("--blobs", type=int, default=30, help="per upload session")
+    parser.add_argument("--runs", type=int, default=200, help="executions of each query")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print the whole query plans")
+
+    asyncio.run(main(parser.parse_args()))
@@ -4,3 +4,11 @@ from enum import Enum
 class MediaBackends(str, Enum):
     deta = "DETA"
     filesystem = "FS"
+    s3 = "S3"
+
+
+class MediaDelivery(str, Enum):
+    proxy = "PROXY"
+    redirect = "REDIRECT"
+    x_accel = "X-ACCEL"
+    x_sendfile = "X-SENDFILE"
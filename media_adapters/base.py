@@ -0,0 +1,206 @@
+import asyncio
+import mimetypes
+import re
+from email.utils import parsedate
+from io import FileIO
+from typing import Callable, Iterable, Iterator, List, Mapping, Optional
+
+from pydantic import BaseSettings, Field
+from starlette.concurrency import run_in_threadpool
+
+# Older Python versions don't know the WebP extension, the mounts guess the content type of the files with it
+mimetypes.add_type("image/webp", ".webp")
+
+
+# Files that never change once saved: the content-addressed objects and the versioned folders of the chapters
+IMMUTABLE_FILES = re.compile(r"^(objects/|[^/]+/[^/]+/v[0-9]+/)")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_CACHE_CONTROL = "max-age=1728000"
+
+
+def is_immutable(name: str):
+    """
+    Whether the file can be cached forever, a new version of it would be saved under another name.
+    """
+    return IMMUTABLE_FILES.match(name) is not None
+
+
+def cache_control(name: str):
+    return IMMUTABLE_CACHE_CONTROL if is_immutable(name) else DEFAULT_CACHE_CONTROL
+
+
+def is_not_modified(request_headers: Mapping[str, str], etag: Optional[str], last_modified: Optional[str]):
+    """
+    Whether a conditional GET can be answered with a 304 Not Modified, given the validators of the file.
+    `If-None-Match` takes precedence over `If-Modified-Since`, like RFC 9110 requires.
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag is None:
+            return False
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag.removeprefix("W/") in tags
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since is not None and last_modified is not None:
+        since = parsedate(if_modified_since)
+        modified = parsedate(last_modified)
+        return since is not None and modified is not None and since >= modified
+
+    return False
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def parse_range(range_header: str, size: int) -> Optional[tuple[int, int]]:
+    """
+    Returns the first and last byte (included) requested by a single range `Range` header for a file of `size` bytes.
+    Returns None if the header should be ignored (other units, multiple ranges or invalid syntax), the whole file is
+    sent then. Raises RangeNotSatisfiable if the range starts after the end of the file.
+    """
+    unit, _, byte_range = range_header.partition("=")
+    first, sep, last = byte_range.strip().partition("-")
+    if unit.strip().lower() != "bytes" or not sep or "," in byte_range:
+        return None
+
+    try:
+        first = int(first) if first else None
+        last = int(last) if last else None
+    except ValueError:
+        return None
+
+    if first is None:
+        # Suffix range, the last N bytes
+        if not last or not size:
+            raise RangeNotSatisfiable()
+        return max(size - last, 0), size - 1
+    if last is not None and last < first:
+        return None
+    if first >= size:
+        raise RangeNotSatisfiable()
+    return first, size - 1 if last is None else min(last, size - 1)
+
+
+def iter_range(chunks: Iterable[bytes], first: int, last: int) -> Iterator[bytes]:
+    """
+    Only yields the bytes between `first` and `last` (included) of the chunks, the next ones aren't read.
+    """
+    position = 0
+    for chunk in chunks:
+        end = position + len(chunk)
+        if end > first:
+            yield chunk[max(first - position, 0) : last + 1 - position]
+        if end > last:
+            break
+        position = end
+
+
+class MediaSettings(BaseSettings):
+    # Maximum amount of media operations running at the same time during bulk operations
+    media_concurrency: int = Field(8, gt=0)
+    # Size of the chunks the media mounts stream the files in
+    media_chunk_size: int = Field(64 * 1024, gt=0)
+
+
+class BaseMedia:
+    """
+    Async interface shared by the media backends.
+    The backends implement the blocking operations (`put`, `get`, `copy`...), and the async versions run them in a
+    thread, so they never block the event loop. The bulk operations run at most `concurrency` of them at the same time.
+    """
+
+    # If `url` returns temporary URLs the files can be downloaded from, without going through the API
+    signed_urls = False
+    # If `local_path` returns the path of the files in the local filesystem
+    local_files = False
+    # If `copy` and `link` are done by the storage itself, without the data going through the API
+    server_side_copy = False
+    # If `move` is done by the storage itself (a rename or a server-side copy), without the data going through the API
+    server_side_move = False
+
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+
+    def url(self, name: str, expires: int) -> Optional[str]:
+        """
+        URL the file can be downloaded from for `expires` seconds, only available if `signed_urls` is set.
+        """
+        return None
+
+    def local_path(self, name: str) -> Optional[str]:
+        """
+        Path of the file in the local filesystem, only available if `local_files` is set.
+        Names that lead outside of the media folder return None.
+        """
+        return None
+
+    async def aput(self, name: str, data: FileIO):
+        return await run_in_threadpool(self.put, name, data)
+
+    async def aget(self, name: str):
+        return await run_in_threadpool(self.get, name)
+
+    async def acopy(self, source: str, dest: str):
+        return await run_in_threadpool(self.copy, source, dest)
+
+    def link(self, source: str, dest: str):
+        """
+        Makes `dest` a copy of `source` that will never be modified in place.
+        Backends that can share the data between both names should override it, by default it's a full copy.
+        """
+        self.copy(source, dest)
+
+    async def alink(self, source: str, dest: str):
+        return await run_in_threadpool(self.link, source, dest)
+
+    async def amove(self, source: str, dest: str):
+        return await run_in_threadpool(self.move, source, dest)
+
+    async def aremove(self, name: str):
+        return await run_in_threadpool(self.remove, name)
+
+    async def aremove_many(self, names: List[str]):
+        return await run_in_threadpool(self.remove_many, names)
+
+    async def als(self, dir: str):
+        return await run_in_threadpool(self.ls, dir)
+
+    async def armtree(self, dir: str):
+        return await run_in_threadpool(self.rmtree, dir)
+
+    @staticmethod
+    def object_dir(digest: str):
+        """
+        Folder of a content-addressed object, named after the hash of its content.
+        They're spread in subfolders by the first 2 characters of the hash, so none of them gets too big.
+        """
+        return f"objects/{digest[:2]}/{digest}"
+
+    def object_path(self, digest: str, extension: str):
+        return f"{self.object_dir(digest)}/page.{extension}"
+
+    async def _gather(self, func: Callable, calls: Iterable[tuple]):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(args: tuple):
+            async with semaphore:
+                return await run_in_threadpool(func, *args)
+
+        return await asyncio.gather(*(run(args) for args in calls))
+
+    async def put_many(self, files: Iterable[tuple[str, FileIO]]):
+        await self._gather(self.put, files)
+
+    async def copy_many(self, paths: Iterable[tuple[str, str]]):
+        await self._gather(self.copy, paths)
+
+    async def link_many(self, paths: Iterable[tuple[str, str]]):
+        await self._gather(self.link, paths)
+
+    async def move_many(self, paths: Iterable[tuple[str, str]]):
+        await self._gather(self.move, paths)
+
+    async def rmtree_many(self, dirs: Iterable[str]):
+        await self._gather(self.rmtree, ((d,) for d in dirs))
@@ -9,7 +9,7 @@ async def startup():
     """
     Removes lingering blobs.
     """
-    media.rmtree("blobs")
+    await media.armtree("blobs")
 
 
 async def shutdown():
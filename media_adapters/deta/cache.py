@@ -0,0 +1,178 @@
+import hashlib
+from collections import OrderedDict
+from io import BytesIO
+from os import getpid, makedirs, path, remove
+from shutil import rmtree
+from threading import Lock
+from typing import BinaryIO, Callable, Optional
+
+from prometheus_client import Counter
+
+cache_hits = Counter("monochrome_media_cache_hits", "Media files served from the cache", ["tier"])
+cache_misses = Counter("monochrome_media_cache_misses", "Media files that had to be downloaded from Drive")
+
+
+class CachedFile:
+    """
+    File served from the cache, with the same interface as the files Drive returns.
+    """
+
+    def __init__(self, file: BinaryIO):
+        self._file = file
+
+    def read(self, size: Optional[int] = None):
+        return self._file.read(-1 if size is None else size)
+
+    def iter_chunks(self, chunk_size: int = 1024):
+        while chunk := self.read(chunk_size):
+            yield chunk
+
+    def close(self):
+        self._file.close()
+
+
+class CachingFile(CachedFile):
+    """
+    File downloaded from Drive, its content is handed to `on_complete` once it has been fully read.
+    Nothing is kept once it's bigger than `max_size`.
+    """
+
+    def __init__(self, file, max_size: int, on_complete: Callable[[bytes], None]):
+        super().__init__(file)
+        self._chunks = []
+        self._size = 0
+        self._max_size = max_size
+        self._on_complete = on_complete
+
+    def _record(self, chunk: bytes):
+        if self._chunks is None:
+            return
+        if not chunk:
+            self._on_complete(b"".join(self._chunks))
+            self._chunks = None
+            return
+
+        self._size += len(chunk)
+        self._chunks.append(chunk)
+        if self._size > self._max_size:
+            self._chunks = None
+
+    def read(self, size: Optional[int] = None):
+        chunk = self._file.read(size)
+        self._record(chunk)
+        if size is None:
+            self._record(b"")
+        return chunk
+
+
+class MediaCache:
+    """
+    LRU cache of the media files, bounded by the total size of the files it holds in memory.
+    The files evicted from memory can be kept on the local disk, in a LRU bounded the same way.
+    Each entry remembers the SHA-256 of its content, so it can be checked against the metadata of the file, and the
+    metadata it was downloaded with, so the immutable files can be served without looking it up.
+    """
+
+    def __init__(self, max_size: int, max_item_size: int, disk_path: Optional[str] = None, disk_size: int = 0):
+        self.max_size = max_size
+        self.max_item_size = max_item_size
+        self.disk_size = disk_size if disk_path else 0
+        # Every worker process has its own cache
+        self.disk_path = path.join(disk_path, str(getpid())) if self.disk_size else None
+
+        self._lock = Lock()
+        # Changes every time an entry is invalidated, files being downloaded at that moment aren't cached
+        self._generation = 0
+        self._memory: OrderedDict[str, tuple[bytes, str, Optional[dict]]] = OrderedDict()
+        self._memory_used = 0
+        self._disk: OrderedDict[str, tuple[int, str, Optional[dict]]] = OrderedDict()
+        self._disk_used = 0
+
+        if self.disk_path:
+            rmtree(self.disk_path, True)
+            makedirs(self.disk_path)
+
+    def _disk_file(self, name: str):
+        return path.join(self.disk_path, hashlib.sha1(name.encode()).hexdigest())
+
+    def get(self, name: str, sha256: Optional[str] = None) -> Optional[CachedFile]:
+        """
+        Returns the cached file, or None if it isn't cached or its content isn't the one expected.
+        """
+        with self._lock:
+            if name in self._memory and sha256 in (None, self._memory[name][1]):
+                self._memory.move_to_end(name)
+                cache_hits.labels("memory").inc()
+                return CachedFile(BytesIO(self._memory[name][0]))
+
+            if name in self._disk and sha256 in (None, self._disk[name][1]):
+                self._disk.move_to_end(name)
+                cache_hits.labels("disk").inc()
+                # The file stays readable even if it's evicted in the meantime
+                return CachedFile(open(self._disk_file(name), "rb"))
+
+            self._discard(name)
+            cache_misses.inc()
+            return None
+
+    def metadata(self, name: str) -> Optional[dict]:
+        """
+        Returns the metadata the cached file was downloaded with, if it's cached.
+        """
+        with self._lock:
+            entry = self._memory.get(name) or self._disk.get(name)
+            return entry[2] if entry else None
+
+    def wrap(self, name: str, file, metadata: Optional[dict] = None) -> CachingFile:
+        """
+        Wraps a file downloaded from Drive, it's added to the cache (with its metadata) once it has been fully read.
+        """
+        generation = self._generation
+        return CachingFile(file, self.max_item_size, lambda data: self._add(name, data, metadata, generation))
+
+    def _add(self, name: str, data: bytes, metadata: Optional[dict], generation: int):
+        sha256 = hashlib.sha256(data).hexdigest()
+        # Metadata that doesn't describe this content isn't kept
+        if metadata and metadata["sha256"] != sha256:
+            metadata = None
+
+        with self._lock:
+            if generation != self._generation:
+                return
+
+            self._discard(name)
+            self._memory[name] = (data, sha256, metadata)
+            self._memory_used += len(data)
+
+            while self._memory_used > self.max_size:
+                evicted, (evicted_data, *evicted_entry) = self._memory.popitem(last=False)
+                self._memory_used -= len(evicted_data)
+                self._spill(evicted, evicted_data, *evicted_entry)
+
+    def _spill(self, name: str, data: bytes, sha256: str, metadata: Optional[dict]):
+        if len(data) > self.disk_size:
+            return
+
+        with open(self._disk_file(name), "wb") as f:
+            f.write(data)
+        self._disk[name] = (len(data), sha256, metadata)
+        self._disk_used += len(data)
+
+        while self._disk_used > self.disk_size:
+            evicted, (size, *_) = self._disk.popitem(last=False)
+            self._disk_used -= size
+            remove(self._disk_file(evicted))
+
+    def _discard(self, name: str):
+        if name in self._memory:
+            data, *_ = self._memory.pop(name)
+            self._memory_used -= len(data)
+        if name in self._disk:
+            size, *_ = self._disk.pop(name)
+            self._disk_used -= size
+            remove(self._disk_file(name))
+
+    def invalidate(self, name: str):
+        with self._lock:
+            self._generation += 1
+            self._discard(name)
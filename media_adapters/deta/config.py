@@ -1,10 +1,20 @@
 from functools import lru_cache
+from typing import Optional
 
-from pydantic import BaseSettings
+from pydantic import Field
 
+from ..base import MediaSettings
 
-class DetaMediaSettings(BaseSettings):
+
+class DetaMediaSettings(MediaSettings):
     deta_project_key: str
+    # Size of the in-memory cache of the media files (per worker) in bytes, 0 disables it
+    media_cache_size: int = Field(64 * 1024 * 1024, ge=0)
+    # Files bigger than this aren't cached
+    media_cache_max_item_size: int = Field(4 * 1024 * 1024, gt=0)
+    # Folder where the files evicted from memory are kept, up to `media_cache_disk_size` bytes
+    media_cache_path: Optional[str] = None
+    media_cache_disk_size: int = Field(1024 * 1024 * 1024, ge=0)
 
 
 @lru_cache(1)
@@ -1,30 +1,124 @@
+import hashlib
 from io import FileIO
 from tempfile import TemporaryFile
-from typing import List
+from threading import local
+from time import time
+from typing import Iterable, List, Optional
 
-from deta import Drive
+from deta import Base, Drive
+from starlette.concurrency import run_in_threadpool
 
+from ..base import BaseMedia
+from .cache import MediaCache
 from .config import get_settings
 
 media_settings = get_settings()
 
 TEN_KB = 10 * 1024
+ONE_MB = 1024 * 1024
+# Maximum amount of items Deta Base accepts in a single put_many, and of files Drive deletes at once
+PUT_MANY_LIMIT = 25
+DELETE_MANY_LIMIT = 1000
 
 
-class Media:
+class Media(BaseMedia):
     def __init__(self) -> None:
-        self.drive = Drive("media")
+        super().__init__(media_settings.media_concurrency)
+        self._local = local()
+        self.cache = None
+        if media_settings.media_cache_size:
+            self.cache = MediaCache(
+                media_settings.media_cache_size,
+                media_settings.media_cache_max_item_size,
+                media_settings.media_cache_path,
+                media_settings.media_cache_disk_size,
+            )
+
+    @property
+    def drive(self) -> Drive:
+        # The Drive client reuses a single connection, so each thread needs its own client
+        if not hasattr(self._local, "drive"):
+            self._local.drive = Drive("media")
+        return self._local.drive
+
+    @property
+    def files(self) -> Base:
+        # Deta Drive doesn't keep any metadata, so the hash, size and modification time of each file are saved here
+        if not hasattr(self._local, "files"):
+            self._local.files = Base("media_files")
+        return self._local.files
+
+    @staticmethod
+    def _key(name: str):
+        return hashlib.sha1(name.encode()).hexdigest()
+
+    def metadata(self, name: str) -> Optional[dict]:
+        """
+        Returns the `sha256`, `size` and `modified` (timestamp) of the file, if they're known.
+        """
+        return self.files.get(self._key(name))
+
+    async def ametadata(self, name: str):
+        return await run_in_threadpool(self.metadata, name)
+
+    def cached_metadata(self, name: str) -> Optional[dict]:
+        """
+        Returns the metadata of the file if it's cached, without looking it up in Deta Base.
+        """
+        return self.cache.metadata(name) if self.cache else None
+
+    def _put_file(self, name: str, data: FileIO) -> Optional[dict]:
+        """
+        Saves the file in Drive, returns its metadata (if it can be computed), it still needs to be saved.
+        """
+        metadata = None
+        if data.seekable():
+            start = data.tell()
+            sha, size = hashlib.sha256(), 0
+            while chunk := data.read(ONE_MB):
+                sha.update(chunk)
+                size += len(chunk)
+            data.seek(start)
+            metadata = {"name": name, "sha256": sha.hexdigest(), "size": size, "modified": time()}
 
-    def put(self, name: str, data: FileIO):
         self.drive.put(name, data)
+        if self.cache:
+            self.cache.invalidate(name)
+        return metadata
+
+    def _save_metadata(self, files: List[tuple[str, Optional[dict]]]):
+        """
+        Saves the metadata of the (name, metadata) pairs in batches, the files without any have theirs removed.
+        """
+        items = [{**metadata, "key": self._key(name)} for name, metadata in files if metadata]
+        for i in range(0, len(items), PUT_MANY_LIMIT):
+            self.files.put_many(items[i : i + PUT_MANY_LIMIT])
+        for name, metadata in files:
+            if not metadata:
+                self.files.delete(self._key(name))
+
+    def put(self, name: str, data: FileIO):
+        self._save_metadata([(name, self._put_file(name, data))])
+
+    def get(self, name: str, metadata: Optional[dict] = None):
+        """
+        Returns the file, from the cache if possible.
+        If the `metadata` of the file is provided the cached version is only used if its SHA-256 matches, so other
+        workers' changes are seen. It's cached with the file otherwise.
+        """
+        if self.cache and (cached := self.cache.get(name, metadata["sha256"] if metadata else None)):
+            return cached
 
-    def get(self, name: str):
         file = self.drive.get(name)
         if not file:
             raise FileNotFoundError(f"{name} not found in the Deta Drive")
-        return file
+        return self.cache.wrap(name, file, metadata) if self.cache else file
 
-    def copy(self, source: str, dest: str):
+    async def aget(self, name: str, metadata: Optional[dict] = None):
+        return await run_in_threadpool(self.get, name, metadata)
+
+    def _copy_file(self, source: str, dest: str) -> Optional[dict]:
+        # Drive can't copy nor rename files, they go through the API (from the cache if possible)
         big_file = self.get(source)
 
         with TemporaryFile() as f:
@@ -32,18 +126,29 @@ class Media:
                 f.write(chunk)
             big_file.close()
             f.seek(0)
-            self.drive.put(dest, f)
+            return self._put_file(dest, f)
+
+    def copy(self, source: str, dest: str):
+        self._save_metadata([(dest, self._copy_file(source, dest))])
 
     def move(self, source: str, dest: str):
         self.copy(source, dest)
         self.remove(source)
 
+    def _remove_metadata(self, name: str):
+        self.files.delete(self._key(name))
+        if self.cache:
+            self.cache.invalidate(name)
+
     def remove(self, name: str):
         self.drive.delete(name)
+        self._remove_metadata(name)
 
     def remove_many(self, names: List[str]):
-        if names:
-            self.drive.delete_many(names)
+        for i in range(0, len(names), DELETE_MANY_LIMIT):
+            self.drive.delete_many(names[i : i + DELETE_MANY_LIMIT])
+        for name in names:
+            self._remove_metadata(name)
 
     def ls(self, dir: str):
         res = self.drive.list(prefix=dir)
@@ -59,5 +164,34 @@ class Media:
         names = self.ls(dir)
         self.remove_many(names)
 
+    async def put_many(self, files: Iterable[tuple[str, FileIO]]):
+        files = list(files)
+        metadata = await self._gather(self._put_file, files)
+        await run_in_threadpool(self._save_metadata, [(name, m) for (name, _), m in zip(files, metadata)])
+
+    async def copy_many(self, paths: Iterable[tuple[str, str]]):
+        paths = list(paths)
+        metadata = await self._gather(self._copy_file, paths)
+        await run_in_threadpool(self._save_metadata, [(dest, m) for (_, dest), m in zip(paths, metadata)])
+
+    async def link_many(self, paths: Iterable[tuple[str, str]]):
+        await self.copy_many(paths)
+
+    async def move_many(self, paths: Iterable[tuple[str, str]]):
+        paths = list(paths)
+        await self.copy_many(paths)
+        await self.aremove_many([source for source, _ in paths])
+
+    async def aremove_many(self, names: List[str]):
+        names = list(names)
+        for i in range(0, len(names), DELETE_MANY_LIMIT):
+            await run_in_threadpool(self.drive.delete_many, names[i : i + DELETE_MANY_LIMIT])
+        # Deta Base can't delete several items at once, the deletes run concurrently instead
+        await self._gather(self._remove_metadata, ((name,) for name in names))
+
+    async def rmtree_many(self, dirs: Iterable[str]):
+        names = await self._gather(self.ls, ((dir,) for dir in dirs))
+        await self.aremove_many([name for dir_names in names for name in dir_names])
+
 
 media = Media()
@@ -1,18 +1,71 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
+import mimetypes
+from email.utils import formatdate
+from typing import Optional
 
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+from ..base import RangeNotSatisfiable, cache_control, is_immutable, is_not_modified, iter_range, parse_range
+from .config import get_settings
 from .media import media
 
+media_settings = get_settings()
+
 mount = FastAPI(title="Monochrome media API")
 
 
+def _stream(res, first: Optional[int] = None, last: Optional[int] = None):
+    try:
+        chunks = res.iter_chunks(media_settings.media_chunk_size)
+        yield from chunks if first is None else iter_range(chunks, first, last)
+    finally:
+        res.close()
+
+
 @mount.get("/{file:path}")
-async def get_media_file(file: str):
+async def get_media_file(file: str, request: Request):
     """Get the media files from Deta Drive"""
-    headers = {"Cache-Control": "max-age=1728000"}
+    headers = {"Cache-Control": cache_control(file)}
+    byte_range = None
+
+    # The validators come from the content of the file, so they only change when it does. The immutable files never
+    # change once saved (and saving or removing one invalidates the cache), so the metadata they were cached with is
+    # used as it is, the others are looked up in Deta Base to check the cached version.
+    metadata = media.cached_metadata(file) if is_immutable(file) else None
+    if not metadata:
+        metadata = await media.ametadata(file)
+    if metadata:
+        headers["ETag"] = f'"{metadata["sha256"]}"'
+        headers["Last-Modified"] = formatdate(metadata["modified"], usegmt=True)
+        if is_not_modified(request.headers, headers["ETag"], headers["Last-Modified"]):
+            return Response(status_code=304, headers=headers)
+
+        # Ranges need the size of the file, they're ignored if it changed since `If-Range`
+        headers["Accept-Ranges"] = "bytes"
+        size = metadata["size"]
+        if_range = request.headers.get("if-range")
+        if "range" in request.headers and if_range in (None, headers["ETag"], headers["Last-Modified"]):
+            try:
+                byte_range = parse_range(request.headers["range"], size)
+            except RangeNotSatisfiable:
+                return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+        if byte_range:
+            headers["Content-Range"] = f"bytes {byte_range[0]}-{byte_range[1]}/{size}"
+            headers["Content-Length"] = str(byte_range[1] - byte_range[0] + 1)
+        else:
+            headers["Content-Length"] = str(size)
 
     try:
-        res = media.get(file)
+        res = await media.aget(file, metadata)
     except FileNotFoundError:
         raise HTTPException(404, "Resource not found")
-    return StreamingResponse(res.iter_chunks(1024), media_type="image/png", headers=headers)
+
+    media_type, _ = mimetypes.guess_type(file)
+    # Drive always sends the whole file, the bytes before the range are skipped
+    return StreamingResponse(
+        _stream(res, *(byte_range or ())),
+        status_code=206 if byte_range else 200,
+        media_type=media_type or "image/jpeg",
+        headers=headers,
+    )
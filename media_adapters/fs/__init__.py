@@ -2,8 +2,11 @@ from shutil import rmtree
 
 from aiofiles.os import makedirs
 from aiofiles.os import wrap as async_wrap
-from starlette.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
 
+from ..base import IMMUTABLE_CACHE_CONTROL, is_immutable, is_not_modified
 from .config import get_settings
 from .media import media
 
@@ -26,5 +29,25 @@ async def shutdown():
     pass
 
 
-mount = StaticFiles(directory=media_settings.media_path)
+class MediaFiles(StaticFiles):
+    """
+    Static files that also understand `If-None-Match` lists and weak ETags when revalidating.
+    The files that never change are sent with an immutable `Cache-Control`.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, method=scope["method"])
+        # Set before revalidating, 304 responses keep it
+        if is_immutable(self.get_path(scope)):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def is_not_modified(self, response_headers: Headers, request_headers: Headers):
+        return is_not_modified(request_headers, response_headers.get("etag"), response_headers.get("last-modified"))
+
+
+mount = MediaFiles(directory=media_settings.media_path)
 media = media
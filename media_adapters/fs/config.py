@@ -1,10 +1,10 @@
 from functools import lru_cache
 from os import path
 
-from pydantic import BaseSettings
+from ..base import MediaSettings
 
 
-class FilesystemSettings(BaseSettings):
+class FilesystemSettings(MediaSettings):
     media_path: str
 
     def media(self, folder: str):
@@ -1,8 +1,9 @@
 import shutil
 from io import FileIO
-from os import listdir, makedirs, path, remove
+from os import link, listdir, makedirs, path, remove
 from typing import List
 
+from ..base import BaseMedia
 from .config import get_settings
 
 media_settings = get_settings()
@@ -10,16 +11,35 @@ media_settings = get_settings()
 TEN_KB = 10 * 1024
 
 
-class Media:
+class Media(BaseMedia):
+    local_files = True
+    server_side_copy = True
+    server_side_move = True
+
+    def __init__(self) -> None:
+        super().__init__(media_settings.media_concurrency)
+
     def _create_parents(self, name: str):
         makedirs(path.dirname(name), exist_ok=True)
 
     def _path(self, name: str):
         return media_settings.media(name)
 
+    def _remove_existing(self, name: str):
+        # Writing to a hard-linked file would change all of its links, so it's unlinked first
+        if path.exists(name):
+            remove(name)
+
+    def local_path(self, name: str):
+        # Names that lead outside of the media folder (absolute paths, `..`, symlinks) don't have a local path
+        root = path.realpath(media_settings.media_path)
+        local_path = path.realpath(self._path(name))
+        return local_path if path.commonpath((root, local_path)) == root else None
+
     def put(self, name: str, data: FileIO):
         name = self._path(name)
         self._create_parents(name)
+        self._remove_existing(name)
 
         with open(name, "wb") as f:
             while chunk := data.read(TEN_KB):
@@ -33,15 +53,29 @@ class Media:
         dest = self._path(dest)
         self._create_parents(dest)
 
+        self._remove_existing(dest)
+
         shutil.copy(source, dest)
 
-    def move(self, source: str, dest: str):
+    def link(self, source: str, dest: str):
+        """
+        Hard links `dest` to `source` so no data is copied, falls back to a copy if the FS doesn't support it.
+        """
         source = self._path(source)
         dest = self._path(dest)
         self._create_parents(dest)
+        self._remove_existing(dest)
 
-        if path.exists(dest):
-            remove(dest)
+        try:
+            link(source, dest)
+        except OSError:
+            shutil.copy(source, dest)
+
+    def move(self, source: str, dest: str):
+        source = self._path(source)
+        dest = self._path(dest)
+        self._create_parents(dest)
+        self._remove_existing(dest)
 
         shutil.move(source, dest)
 
@@ -0,0 +1,20 @@
+from .config import get_settings
+from .media import media
+from .mount import mount
+
+media_settings = get_settings()
+
+
+async def startup():
+    """
+    Removes lingering blobs.
+    """
+    await media.armtree("blobs")
+
+
+async def shutdown():
+    pass
+
+
+mount = mount
+media = media
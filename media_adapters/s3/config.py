@@ -0,0 +1,25 @@
+from functools import lru_cache
+from typing import Optional
+
+from pydantic import Field
+
+from ..base import MediaSettings
+
+
+class S3MediaSettings(MediaSettings):
+    s3_bucket: str
+    # Only needed for S3-compatible services (MinIO, R2...), the credentials and region can also come from the
+    # usual AWS variables and files
+    s3_endpoint_url: Optional[str] = None
+    s3_region: Optional[str] = None
+    s3_access_key: Optional[str] = None
+    s3_secret_key: Optional[str] = None
+    # Files bigger than this are uploaded in parts of this size (S3 needs at least 5 MB)
+    s3_multipart_chunk_size: int = Field(8 * 1024 * 1024, ge=5 * 1024 * 1024)
+    # Connections kept open to the service, shared by all the threads of the worker
+    s3_max_pool_connections: int = Field(32, gt=0)
+
+
+@lru_cache(1)
+def get_settings():
+    return S3MediaSettings()
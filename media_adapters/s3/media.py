@@ -0,0 +1,166 @@
+import mimetypes
+from email.utils import formatdate, parsedate_to_datetime
+from io import FileIO
+from typing import List, Mapping, Optional
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from ..base import BaseMedia
+from .config import get_settings
+
+media_settings = get_settings()
+
+# Maximum amount of keys S3 accepts in a single DeleteObjects
+DELETE_MANY_LIMIT = 1000
+
+
+class NotModified(Exception):
+    """
+    The file didn't change, with the validators S3 sent so the 304 can include them.
+    """
+
+    def __init__(self, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        super().__init__()
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class DeleteFailed(Exception):
+    """
+    Some files couldn't be deleted, S3 reports the failures of DeleteObjects in its response.
+    """
+
+    def __init__(self, errors: List[dict]):
+        super().__init__(", ".join(f"{error['Key']}: {error.get('Code')} {error.get('Message')}" for error in errors))
+        self.errors = errors
+
+
+class Media(BaseMedia):
+    signed_urls = True
+    server_side_copy = True
+    server_side_move = True
+
+    def __init__(self) -> None:
+        super().__init__(media_settings.media_concurrency)
+        self.bucket = media_settings.s3_bucket
+        # Clients are thread-safe, a single one shares its connection pool with all the threads
+        self.client = boto3.session.Session().client(
+            "s3",
+            endpoint_url=media_settings.s3_endpoint_url,
+            region_name=media_settings.s3_region,
+            aws_access_key_id=media_settings.s3_access_key,
+            aws_secret_access_key=media_settings.s3_secret_key,
+            config=Config(max_pool_connections=media_settings.s3_max_pool_connections),
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=media_settings.s3_multipart_chunk_size,
+            multipart_chunksize=media_settings.s3_multipart_chunk_size,
+            max_concurrency=1,
+        )
+
+    @staticmethod
+    def _not_found(error: ClientError):
+        return error.response["Error"]["Code"] in ("404", "NoSuchKey")
+
+    def _not_modified(self, name: str, error: ClientError) -> NotModified:
+        # S3 sends the validators with its 304, they're requested to the storages that don't
+        response_headers = error.response.get("ResponseMetadata", {}).get("HTTPHeaders", {})
+        if "etag" in response_headers:
+            return NotModified(response_headers["etag"], response_headers.get("last-modified"))
+
+        head = self.client.head_object(Bucket=self.bucket, Key=name)
+        return NotModified(head["ETag"], formatdate(head["LastModified"].timestamp(), usegmt=True))
+
+    def put(self, name: str, data: FileIO):
+        media_type, _ = mimetypes.guess_type(name)
+        extra_args = {"ContentType": media_type} if media_type else None
+        self.client.upload_fileobj(data, self.bucket, name, ExtraArgs=extra_args, Config=self.transfer_config)
+
+    def get(self, name: str):
+        return self.get_object(name)["Body"]
+
+    def get_object(self, name: str, headers: Mapping[str, str] = {}):
+        """
+        Returns the GetObject response of the file, the range and the conditions of the request headers are forwarded.
+        Raises FileNotFoundError, NotModified or RangeNotSatisfiable.
+        """
+        params = {"Bucket": self.bucket, "Key": name}
+        if "if-none-match" in headers:
+            params["IfNoneMatch"] = headers["if-none-match"]
+        elif "if-modified-since" in headers:
+            try:
+                params["IfModifiedSince"] = parsedate_to_datetime(headers["if-modified-since"])
+            except (TypeError, ValueError):
+                pass
+        # S3 doesn't support If-Range, the whole file is sent instead
+        if "range" in headers and "if-range" not in headers:
+            params["Range"] = headers["range"]
+
+        try:
+            return self.client.get_object(**params)
+        except ClientError as e:
+            if self._not_found(e):
+                raise FileNotFoundError(f"{name} not found in the bucket")
+            elif e.response["Error"]["Code"] == "304":
+                raise self._not_modified(name, e)
+            elif e.response["Error"]["Code"] == "InvalidRange":
+                raise RangeNotSatisfiable()
+            raise
+
+    def url(self, name: str, expires: int):
+        return self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": name}, ExpiresIn=expires
+        )
+
+    def copy(self, source: str, dest: str):
+        # Managed copy, done by S3 itself (in parts for the biggest files)
+        try:
+            self.client.copy({"Bucket": self.bucket, "Key": source}, self.bucket, dest, Config=self.transfer_config)
+        except ClientError as e:
+            if self._not_found(e):
+                raise FileNotFoundError(f"{source} not found in the bucket")
+            raise
+
+    def move(self, source: str, dest: str):
+        self.copy(source, dest)
+        self.remove(source)
+
+    def remove(self, name: str):
+        self.client.delete_object(Bucket=self.bucket, Key=name)
+
+    def remove_many(self, names: List[str]):
+        """
+        Deletes the files in batches, raises DeleteFailed once all of them are sent if some couldn't be deleted.
+        """
+        errors = []
+        for i in range(0, len(names), DELETE_MANY_LIMIT):
+            objects = [{"Key": name} for name in names[i : i + DELETE_MANY_LIMIT]]
+            # Quiet mode only reports the failures
+            res = self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": objects, "Quiet": True})
+            errors += res.get("Errors", [])
+
+        if errors:
+            raise DeleteFailed(errors)
+
+    def ls(self, dir: str):
+        prefix = dir.rstrip("/") + "/"
+        paginator = self.client.get_paginator("list_objects_v2")
+
+        return [
+            obj["Key"]
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix)
+            for obj in page.get("Contents", [])
+        ]
+
+    def rmtree(self, dir: str):
+        self.remove_many(self.ls(dir))
+
+
+media = Media()
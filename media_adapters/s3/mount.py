@@ -0,0 +1,55 @@
+import mimetypes
+from email.utils import formatdate
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from ..base import cache_control
+from .config import get_settings
+from .media import NotModified, RangeNotSatisfiable, media
+
+media_settings = get_settings()
+
+mount = FastAPI(title="Monochrome media API")
+
+
+def _stream(body):
+    try:
+        yield from body.iter_chunks(media_settings.media_chunk_size)
+    finally:
+        body.close()
+
+
+@mount.get("/{file:path}")
+async def get_media_file(file: str, request: Request):
+    """Get the media files from the bucket, S3 handles the ranges and the conditional requests"""
+    headers = {"Cache-Control": cache_control(file)}
+
+    try:
+        res = await run_in_threadpool(media.get_object, file, request.headers)
+    except FileNotFoundError:
+        raise HTTPException(404, "Resource not found")
+    except NotModified as e:
+        if e.etag:
+            headers["ETag"] = e.etag
+        if e.last_modified:
+            headers["Last-Modified"] = e.last_modified
+        return Response(status_code=304, headers=headers)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers=headers)
+
+    headers["ETag"] = res["ETag"]
+    headers["Last-Modified"] = formatdate(res["LastModified"].timestamp(), usegmt=True)
+    headers["Accept-Ranges"] = "bytes"
+    headers["Content-Length"] = str(res["ContentLength"])
+    if "ContentRange" in res:
+        headers["Content-Range"] = res["ContentRange"]
+
+    media_type = res.get("ContentType") or mimetypes.guess_type(file)[0]
+    return StreamingResponse(
+        _stream(res["Body"]),
+        status_code=206 if "ContentRange" in res else 200,
+        media_type=media_type or "image/jpeg",
+        headers=headers,
+    )
@@ -0,0 +1,10 @@
+import os
+import tempfile
+
+# The settings are read when the modules are imported, so the tests use a media folder of their own
+os.environ.setdefault("DB_BACKEND", "POSTGRES")
+os.environ.setdefault("MEDIA_BACKEND", "FS")
+os.environ.setdefault("MEDIA_PATH", tempfile.mkdtemp(prefix="monochrome-media-"))
+os.environ.setdefault("JWT_SECRET_KEY", "test")
+for name in ("PG_HOST", "PG_USER", "PG_PASS", "PG_DB"):
+    os.environ.setdefault(name, "test")
@@ -0,0 +1,66 @@
+import asyncio
+from os import makedirs, path, symlink
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from api.config import MediaDelivery
+from api.media import _delivery_mount
+from media_adapters.fs.config import get_settings
+
+media_path = get_settings().media_path
+
+
+def get(delivery: MediaDelivery, url: str):
+    app = FastAPI()
+    app.mount("/media", _delivery_mount(delivery))
+
+    async def request():
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get(url)
+
+    return asyncio.run(request())
+
+
+@pytest.fixture(scope="module", autouse=True)
+def page():
+    makedirs(path.join(media_path, "manga/chapter/v1"), exist_ok=True)
+    with open(path.join(media_path, "manga/chapter/v1/1.jpg"), "wb") as f:
+        f.write(b"page")
+
+
+@pytest.mark.parametrize("delivery", (MediaDelivery.x_sendfile, MediaDelivery.x_accel))
+def test_delivery_sends_media_files(delivery):
+    res = get(delivery, "/media/manga/chapter/v1/1.jpg")
+    assert res.status_code == 200
+    if delivery == MediaDelivery.x_sendfile:
+        assert res.headers["X-Sendfile"] == path.realpath(path.join(media_path, "manga/chapter/v1/1.jpg"))
+    else:
+        assert res.headers["X-Accel-Redirect"].endswith("/manga/chapter/v1/1.jpg")
+
+
+@pytest.mark.parametrize("delivery", (MediaDelivery.x_sendfile, MediaDelivery.x_accel))
+@pytest.mark.parametrize(
+    "url",
+    (
+        "/media//etc/passwd",
+        "/media/%2Fetc/passwd",
+        "/media/manga/../../../etc/passwd",
+        "/media/manga/%2E%2E/%2E%2E/etc/passwd",
+        "/media/manga/%2E/chapter/v1/1.jpg",
+    ),
+)
+def test_delivery_rejects_paths_outside_the_media_folder(delivery, url):
+    res = get(delivery, url)
+    assert res.status_code == 404
+    assert "X-Sendfile" not in res.headers
+    assert "X-Accel-Redirect" not in res.headers
+
+
+def test_delivery_rejects_symlinks_outside_the_media_folder():
+    link = path.join(media_path, "manga/outside.jpg")
+    if not path.islink(link):
+        symlink("/etc/passwd", link)
+    res = get(MediaDelivery.x_sendfile, "/media/manga/outside.jpg")
+    assert res.status_code == 404
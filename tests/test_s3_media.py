@@ -0,0 +1,85 @@
+import asyncio
+import os
+from io import BytesIO
+
+import boto3
+import pytest
+from moto import mock_s3
+
+os.environ.setdefault("S3_BUCKET", "monochrome")
+os.environ.setdefault("S3_REGION", "us-east-1")
+os.environ.setdefault("S3_ACCESS_KEY", "test")
+os.environ.setdefault("S3_SECRET_KEY", "test")
+# Parts of the smallest size S3 accepts, so the multipart upload is used without a big file
+os.environ.setdefault("S3_MULTIPART_CHUNK_SIZE", str(5 * 1024 * 1024))
+
+BIG_FILE = os.urandom(12 * 1024 * 1024)
+
+
+@pytest.fixture(scope="module")
+def media():
+    with mock_s3():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="monochrome")
+        from media_adapters.s3.media import media
+
+        yield media
+
+
+def test_put_in_parts_and_get(media):
+    media.put("blobs/big.jpg", BytesIO(BIG_FILE))
+    assert media.get("blobs/big.jpg").read() == BIG_FILE
+
+    res = media.get_object("blobs/big.jpg")
+    assert res["ContentType"] == "image/jpeg"
+    # Uploads done in parts have an ETag ending with their amount of parts
+    assert res["ETag"].endswith('-3"')
+
+
+def test_get_missing_file(media):
+    with pytest.raises(FileNotFoundError):
+        media.get("blobs/missing.jpg")
+
+
+def test_conditional_and_range_requests(media):
+    from media_adapters.s3.media import NotModified, RangeNotSatisfiable
+
+    media.put("m/c/1.jpg", BytesIO(b"0123456789"))
+    etag = media.get_object("m/c/1.jpg")["ETag"]
+
+    with pytest.raises(NotModified) as e:
+        media.get_object("m/c/1.jpg", {"if-none-match": etag})
+    assert e.value.etag == etag
+    assert e.value.last_modified
+
+    assert media.get_object("m/c/1.jpg", {"range": "bytes=2-4"})["Body"].read() == b"234"
+    with pytest.raises(RangeNotSatisfiable):
+        media.get_object("m/c/1.jpg", {"range": "bytes=20-30"})
+
+
+def test_bulk_operations(media):
+    blobs = [f"blobs/{i}.jpg" for i in range(3)]
+    asyncio.run(media.put_many([(blob, BytesIO(b"page")) for blob in blobs]))
+    asyncio.run(media.move_many([(blob, f"m/c/v1/{i}.jpg") for i, blob in enumerate(blobs)]))
+    asyncio.run(media.copy_many([("m/c/v1/0.jpg", "m/c/v2/0.jpg")]))
+
+    assert sorted(media.ls("m/c/v1")) == [f"m/c/v1/{i}.jpg" for i in range(3)]
+    assert not set(blobs).intersection(media.ls("blobs"))
+    assert media.get("m/c/v2/0.jpg").read() == b"page"
+
+    asyncio.run(media.rmtree_many(["m/c/v1", "m/c/v2"]))
+    assert media.ls("m/c/v1") == media.ls("m/c/v2") == []
+
+
+def test_remove_many_reports_failures(media, monkeypatch):
+    from media_adapters.s3.media import DeleteFailed
+
+    media.put("m/c/2.jpg", BytesIO(b"page"))
+    delete_objects = media.client.delete_objects
+
+    def failing_delete_objects(**kwargs):
+        res = delete_objects(**kwargs)
+        return {**res, "Errors": [{"Key": "m/c/2.jpg", "Code": "AccessDenied", "Message": "Access Denied"}]}
+
+    monkeypatch.setattr(media.client, "delete_objects", failing_delete_objects)
+    with pytest.raises(DeleteFailed, match="m/c/2.jpg: AccessDenied"):
+        media.remove_many(["m/c/2.jpg"])